@@ -95,6 +95,7 @@ let isExerciseShowing = false;
 let cameraThresholdUpdateTimeout: NodeJS.Timeout | null = null;
 let mgdReminderLoopActive = false;
 let cameraWindow: BrowserWindow | null = null;
+let lastGovernorReport: any = null; // Replayed to a camera window opened after the last governor change
 
 let wasTrackingBeforeSleep = false;
 let wasCameraEnabledBeforeSleep = false;
@@ -137,7 +138,8 @@ const preferences = {
 	isTracking: false,
 	keyboardShortcut: store.get('keyboardShortcut', 'Ctrl+I') as string,
 	mgdMode: store.get('mgdMode', false) as boolean,
-	soundEnabled: store.get('soundEnabled', false) as boolean
+	soundEnabled: store.get('soundEnabled', false) as boolean,
+	cpuBudget: store.get('cpuBudget', 0) as number // percent of one core for the blink detector, 0 for no limit
 };
 
 // Windows-specific process killing function
@@ -1093,6 +1095,11 @@ function showCameraWindow() {
 	});
 
 	cameraWindow.loadFile(path.join(process.env.VITE_PUBLIC, 'camera.html'));
+	cameraWindow.webContents.on('did-finish-load', () => {
+		if (lastGovernorReport && cameraWindow && !cameraWindow.isDestroyed()) {
+			cameraWindow.webContents.send('governor-update', lastGovernorReport);
+		}
+	});
 	
 	cameraWindow.on('closed', () => {
 		cameraWindow = null;
@@ -1247,12 +1254,18 @@ function startBlinkDetector() {
 				} else if (parsed.status) {
 					console.log('Blink detector status:', parsed.status);
 					// If the process is ready, send initial configuration
-					if (parsed.status === "Models loaded successfully, ready for camera activation" && blinkDetectorProcess.stdin) {
+					if (parsed.status === "Ready for camera activation" && blinkDetectorProcess.stdin) {
 						const config = {
 							target_fps: 10, 
 							processing_resolution: [320, 240] 
 						};
 						blinkDetectorProcess.stdin.write(JSON.stringify(config) + '\n');
+						// Blink history lives with the rest of the app's data
+						const blinkLog = { blink_log: path.join(app.getPath('userData'), 'blink-log') };
+						blinkDetectorProcess.stdin.write(JSON.stringify(blinkLog) + '\n');
+						if (preferences.cpuBudget > 0) {
+							blinkDetectorProcess.stdin.write(JSON.stringify({ cpu_budget: preferences.cpuBudget }) + '\n');
+						}
 					} else if (parsed.status === "Camera opened successfully" && blinkDetectorProcess.stdin) {
 						isCameraReady = true; 
 						cameraRetryCount = 0; // Reset retry counter on successful camera start
@@ -1266,6 +1279,21 @@ function startBlinkDetector() {
 					if (cameraWindow && !cameraWindow.isDestroyed()) {
 						cameraWindow.webContents.send('video-stream', parsed.videoStream);
 					}
+				} else if (parsed.camera) {
+					// The detector reconnects a lost camera itself; only track readiness here
+					console.log('Blink detector camera event:', parsed.camera);
+					if (parsed.camera.event === 'lost') {
+						isCameraReady = false;
+					} else if (parsed.camera.event === 'recovered') {
+						isCameraReady = true;
+						cameraRetryCount = 0;
+					}
+				} else if (parsed.governor) {
+					console.log('Blink detector governor:', parsed.governor);
+					lastGovernorReport = parsed.governor;
+					if (cameraWindow && !cameraWindow.isDestroyed()) {
+						cameraWindow.webContents.send('governor-update', parsed.governor);
+					}
 				}
 			} catch (error) {
 				console.error('Failed to parse blink detector output:', error);
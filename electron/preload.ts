@@ -12,7 +12,8 @@ contextBridge.exposeInMainWorld('ipcRenderer', {
       'update-message',
       'face-tracking-data',
       'blink-detected',
-      'threshold-updated'
+      'threshold-updated',
+      'governor-update'
     ];
     if (validChannels.includes(channel)) {
       ipcRenderer.on(channel, (_event, ...args) => func(...args));
@@ -97,6 +98,9 @@ contextBridge.exposeInMainWorld('popupAPI', {
   onThresholdUpdated: (callback: (threshold: number) => void) => {
     ipcRenderer.on('threshold-updated', (_event, threshold) => callback(threshold));
   },
+  onGovernorUpdate: (callback: (governor: any) => void) => {
+    ipcRenderer.on('governor-update', (_event, governor) => callback(governor));
+  },
   requestVideoStream: () => {
     ipcRenderer.send('request-video-stream');
   },
@@ -137,6 +141,7 @@ declare global {
       onBlinkDetected: (callback: (blinkData: any) => void) => void;
       onVideoStream: (callback: (streamData: string) => void) => void;
       onThresholdUpdated: (callback: (threshold: number) => void) => void;
+      onGovernorUpdate: (callback: (governor: any) => void) => void;
       requestVideoStream: () => void;
       skipExercise: () => void;
       snoozeExercise: () => void;
@@ -79,6 +79,7 @@ let lastFaceData = null;
 let lastBlinkTime = 0;
 let blinkDisplayTimer = null;
 let currentThreshold = 0.20;
+let lastGovernor = null;
 let thresholdUpdateTimer = null;
 
 function updateInfoDisplay(eyeSize, isBlinking = false) {
@@ -100,11 +101,21 @@ function updateInfoDisplay(eyeSize, isBlinking = false) {
       <strong>Baseline:</strong> ${lastFaceData && lastFaceData.baseline ? lastFaceData.baseline.toFixed(3) : 'Building...'}
       <br>
       <strong>Status:</strong> ${lastFaceData && lastFaceData.blink_phase ? lastFaceData.blink_phase : 'monitoring'}
+      ${governorText()}
     `;
     currentValues.style.background = isBlinking ? 'rgba(0, 255, 0, 0.5)' : 'rgba(0, 0, 0, 0.4)';
   }
 }
 
+function governorText() {
+  // Only shown while a CPU budget is set
+  if (!lastGovernor || !lastGovernor.budget_percent) {
+    return '';
+  }
+  const resolution = lastGovernor.resolution.join('x');
+  return `<br><strong>CPU saving:</strong> level ${lastGovernor.level}/${lastGovernor.max_level}, ${lastGovernor.fps} FPS, ${resolution}`;
+}
+
 function resetBlinkDisplay() {
   if (lastFaceData && lastFaceData.faceDetected) {
     const eyeSize = lastFaceData.ear || 0;
@@ -364,6 +375,11 @@ function initPopup() {
       }, 200);
     });
 
+    window.popupAPI.onGovernorUpdate((governor) => {
+      lastGovernor = governor;
+      updateInfoDisplay(lastFaceData ? lastFaceData.ear : null);
+    });
+
     window.popupAPI.onVideoStream((streamData) => {
       try {
         const canvas = document.getElementById('canvas');
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+"""
+Benchmark attaching to a warm detector daemon against spawning a cold detector.
+
+Cold: start blink_detector.py, wait for "Ready for camera activation", send
+start_camera and time until the first faceData line, as the app does on
+every launch. Warm: start one daemon (--daemon), attach once to let it load
+the models, then time connect -> start_camera -> first faceData for each
+run. With --video, detectors read that file in a loop at 30 fps instead of
+opening a camera, so the benchmark also runs on machines without one.
+"""
+
+import argparse
+import json
+import os
+import queue
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import cv2
+
+DETECTOR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "blink_detector.py")
+
+class LoopingVideoCapture:
+    """cv2.VideoCapture stand-in that plays a video file in a loop at camera pace."""
+    path = None
+    open_video = None
+
+    def __init__(self, *args):
+        self.capture = LoopingVideoCapture.open_video(self.path)
+        self.next_frame = time.perf_counter()
+
+    def isOpened(self):
+        return self.capture.isOpened()
+
+    def read(self):
+        delay = self.next_frame - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        self.next_frame = max(self.next_frame, time.perf_counter()) + 1 / 30
+        ret, frame = self.capture.read()
+        if not ret:
+            self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            ret, frame = self.capture.read()
+        return ret, frame
+
+    def set(self, *args):
+        return True
+
+    def get(self, *args):
+        return 0
+
+    def release(self):
+        self.capture.release()
+
+def run_child(video, detector_args):
+    """Run the detector in this process with the video standing in for the camera."""
+    import runpy
+    LoopingVideoCapture.path = video
+    LoopingVideoCapture.open_video = cv2.VideoCapture
+    cv2.VideoCapture = LoopingVideoCapture
+    sys.argv = [DETECTOR] + detector_args
+    sys.path.insert(0, os.path.dirname(DETECTOR))
+    runpy.run_path(DETECTOR, run_name="__main__")
+
+def detector_command(args, detector_args):
+    if args.video:
+        return [sys.executable, os.path.abspath(__file__), "--child-video", args.video, "--"] + detector_args
+    return [sys.executable, DETECTOR] + detector_args
+
+def line_reader(stream, lines):
+    for line in stream:
+        try:
+            lines.put(json.loads(line))
+        except ValueError:
+            pass
+    lines.put(None)
+
+def wait_for(lines, predicate, timeout):
+    deadline = time.perf_counter() + timeout
+    while True:
+        try:
+            message = lines.get(timeout=max(0.0, deadline - time.perf_counter()))
+        except queue.Empty:
+            raise TimeoutError("detector did not answer in time")
+        if message is None:
+            raise EOFError("detector closed its output")
+        if "error" in message:
+            print(f"  detector error: {message['error']}")
+        if predicate(message):
+            return message
+
+def is_ready(message):
+    return message.get("status") == "Ready for camera activation"
+
+def is_face_data(message):
+    return "faceData" in message
+
+def time_cold(args):
+    start = time.perf_counter()
+    process = subprocess.Popen(detector_command(args, []), stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                               text=True, bufsize=1)
+    lines = queue.Queue()
+    threading.Thread(target=line_reader, args=(process.stdout, lines), daemon=True).start()
+    try:
+        wait_for(lines, is_ready, args.timeout)
+        ready = time.perf_counter()
+        process.stdin.write(json.dumps({"start_camera": True}) + "\n")
+        process.stdin.flush()
+        wait_for(lines, is_face_data, args.timeout)
+        return ready - start, time.perf_counter() - start
+    finally:
+        process.kill()
+        process.wait()
+
+def attach(socket_path, timeout):
+    # The daemon may still be starting up
+    deadline = time.perf_counter() + timeout
+    while True:
+        conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            conn.connect(socket_path)
+            return conn
+        except OSError:
+            conn.close()
+            if time.perf_counter() > deadline:
+                raise
+            time.sleep(0.02)
+
+def time_warm(socket_path, args):
+    start = time.perf_counter()
+    conn = attach(socket_path, args.timeout)
+    lines = queue.Queue()
+    threading.Thread(target=line_reader, args=(conn.makefile("r", encoding="utf-8"), lines), daemon=True).start()
+    try:
+        wait_for(lines, is_ready, args.timeout)
+        ready = time.perf_counter()
+        conn.sendall((json.dumps({"start_camera": True}) + "\n").encode())
+        wait_for(lines, is_face_data, args.timeout)
+        return ready - start, time.perf_counter() - start
+    finally:
+        conn.close()
+
+def summarize(label, results):
+    ready = [r[0] * 1000 for r in results]
+    first = [r[1] * 1000 for r in results]
+    print(f"{label:>6} {statistics.median(ready):>10.0f} {statistics.median(first):>15.0f} "
+          f"{min(first):>8.0f} {max(first):>8.0f}")
+    return statistics.median(first)
+
+def main():
+    if len(sys.argv) > 2 and sys.argv[1] == "--child-video":
+        run_child(sys.argv[2], sys.argv[4:] if sys.argv[3:4] == ["--"] else sys.argv[3:])
+        return
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--video", help="Video file to use instead of the camera")
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for each step")
+    args = parser.parse_args()
+
+    cold = [time_cold(args) for _ in range(args.runs)]
+
+    socket_path = os.path.join(tempfile.mkdtemp(), "detector.sock")
+    daemon = subprocess.Popen(detector_command(args, ["--daemon", "--socket", socket_path, "--idle-shutdown", "60"]),
+                              stdout=subprocess.DEVNULL)
+    try:
+        # The first attach may still wait for the models to load
+        time_warm(socket_path, args)
+        warm = []
+        for _ in range(args.runs):
+            time.sleep(0.5)
+            warm.append(time_warm(socket_path, args))
+    finally:
+        daemon.terminate()
+        daemon.wait()
+
+    print(f"{args.runs} runs each, times in ms (median unless noted)")
+    print(f"{'':>6} {'to ready':>10} {'to first frame':>15} {'min':>8} {'max':>8}")
+    cold_first = summarize("cold", cold)
+    warm_first = summarize("warm", warm)
+    print(f"Warm attach reaches the first result {cold_first / warm_first:.1f}x sooner")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Benchmark parallel tiled face detection against the single-threaded dlib detector.
+
+Frames from a recorded video are cropped to 4:3 or 16:9 and scaled to each
+test resolution. For every worker count the tiled detector is timed on the
+same frames and its faces are matched to the single-threaded ones by
+intersection over union. Reports speedup, and missed or extra faces.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import dlib
+
+import blink_detector
+
+RESOLUTIONS = [(320, 240), (640, 480), (1280, 720)]
+MATCH_IOU = 0.5
+
+def load_frames(video_path, max_frames):
+    capture = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    capture.release()
+    if not frames:
+        print(f"ERROR: No frames could be read from {video_path}")
+        sys.exit(1)
+    return frames
+
+def fit_frame(gray, resolution):
+    # Crop to the target aspect ratio so faces are not stretched
+    height, width = gray.shape
+    target_width, target_height = resolution
+    if width * target_height > height * target_width:
+        crop = height * target_width // target_height
+        gray = gray[:, (width - crop) // 2:(width - crop) // 2 + crop]
+    else:
+        crop = width * target_height // target_width
+        gray = gray[(height - crop) // 2:(height - crop) // 2 + crop, :]
+    return cv2.resize(gray, resolution)
+
+def iou(a, b):
+    width = min(a.right(), b.right()) - max(a.left(), b.left())
+    height = min(a.bottom(), b.bottom()) - max(a.top(), b.top())
+    if width <= 0 or height <= 0:
+        return 0.0
+    intersection = width * height
+    return intersection / (a.area() + b.area() - intersection)
+
+def time_detector(detector, frames):
+    start = time.perf_counter()
+    results = [detector(frame, 0) for frame in frames]
+    return (time.perf_counter() - start) / len(frames), results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("video", help="Recorded video of a face")
+    parser.add_argument("--max-frames", type=int, default=60)
+    parser.add_argument("--workers", type=int, action="append", help="Worker count(s) to test")
+    args = parser.parse_args()
+
+    source = load_frames(args.video, args.max_frames)
+    cores = os.cpu_count() or 1
+    worker_counts = args.workers or [n for n in (2, 3, 4, 6, 8) if n <= max(2, cores)]
+    print(f"{len(source)} frames, {cores} cores")
+    print(f"{'resolution':>11} {'workers':>8} {'tiles':>6} {'ms/frame':>9} {'speedup':>8} {'faces':>6} {'missed':>7} {'extra':>6}")
+
+    single = dlib.get_frontal_face_detector()
+    for resolution in RESOLUTIONS:
+        frames = [fit_frame(gray, resolution) for gray in source]
+        single_time, reference = time_detector(single, frames)
+        face_count = sum(len(faces) for faces in reference)
+        label = f"{resolution[0]}x{resolution[1]}"
+        print(f"{label:>11} {1:>8} {'-':>6} {single_time * 1000:>9.1f} {1.0:>8.2f} {face_count:>6} {'-':>7} {'-':>6}")
+
+        for workers in worker_counts:
+            detector = blink_detector.TiledFaceDetector(workers)
+            plan = detector.plan(*resolution)
+            detector(frames[0], 0)  # warm up the pool and per-thread detectors
+            tiled_time, results = time_detector(detector, frames)
+            detector.close()
+
+            missed = extra = 0
+            for expected, found in zip(reference, results):
+                matched = sum(1 for a in expected if any(iou(a, b) >= MATCH_IOU for b in found))
+                missed += len(expected) - matched
+                extra += len(found) - matched
+            tiles = len(plan) + 1 if plan else 1
+            print(f"{label:>11} {workers:>8} {tiles:>6} {tiled_time * 1000:>9.1f} {single_time / tiled_time:>8.2f} "
+                  f"{sum(len(faces) for faces in results):>6} {missed:>7} {extra:>6}")
+
+if __name__ == "__main__":
+    main()
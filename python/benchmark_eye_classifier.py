@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Compare blinks found with the eye-patch classifier against the every-frame predictor.
+
+Replays recorded videos through BlinkPipeline at --fps, once with the
+classifier off (predictor on every frame) and once per re-anchor interval
+with the classifier fused in between predictor passes. Blinks found with the
+classifier are matched to the reference blinks by onset; recall below 100%
+means the fused EAR lost blinks the predictor alone would have reported.
+"""
+
+import argparse
+import sys
+import time
+
+import cv2
+import numpy as np
+
+import blink_detector
+
+MATCH_TOLERANCE = 0.2
+
+def load_frames(path, fps, max_frames):
+    capture = cv2.VideoCapture(path)
+    source_fps = capture.get(cv2.CAP_PROP_FPS) or 30.0
+    step = max(1, round(source_fps / fps))
+    frames = []
+    timestamps = []
+    index = 0
+    while len(frames) < max_frames:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        if index % step == 0:
+            frames.append(frame)
+            timestamps.append(index / source_fps)
+        index += 1
+    capture.release()
+    return frames, timestamps
+
+def run(frames, timestamps, classifier, refresh_interval, predictor):
+    blink_detector.EYE_CLASSIFIER_ENABLED = classifier is not None
+    blink_detector.EYE_CLASSIFIER_REFRESH_INTERVAL = refresh_interval
+    blink_detector.eye_classifier = classifier
+    pipeline = blink_detector.BlinkPipeline(resolution=blink_detector.PROCESSING_RESOLUTION, predictor=predictor)
+
+    start = time.perf_counter()
+    results = [pipeline.process_frame(frame, t) for frame, t in zip(frames, timestamps)]
+    cost = time.perf_counter() - start
+    onsets = [r.blink["onset"] for r in results if r.blink is not None]
+    ears = np.array([r.ear if r.face_detected else np.nan for r in results])
+    passes = pipeline.tracker.anchored_frames if classifier is not None else len(frames)
+    return onsets, ears, cost / len(frames), passes
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("videos", nargs="+", help="Recorded videos of a face with blinks")
+    parser.add_argument("--model", default=blink_detector.get_model_path(blink_detector.EYE_CLASSIFIER_MODEL),
+                        help="Trained eye openness model (default: the detector's)")
+    parser.add_argument("--refresh", type=int, action="append", help="Re-anchor interval(s) to test (default: 2, 3, 5)")
+    parser.add_argument("--fps", type=float, default=blink_detector.TARGET_FPS, help="Processing rate (default: %(default)s)")
+    parser.add_argument("--max-frames", type=int, default=10000)
+    args = parser.parse_args()
+
+    classifier = blink_detector.EyeOpennessClassifier.load(args.model)
+    _, predictor = blink_detector.load_models()
+
+    print(f"{'video':>24} {'interval':>8} {'blinks':>7} {'matched':>8} {'recall':>7} {'extra':>6} "
+          f"{'EAR diff':>9} {'passes':>7} {'ms/frame':>9}")
+    for path in args.videos:
+        frames, timestamps = load_frames(path, args.fps, args.max_frames)
+        if not frames:
+            print(f"ERROR: no frames read from {path}")
+            sys.exit(1)
+        reference, reference_ears, reference_cost, passes = run(frames, timestamps, None, 1, predictor)
+        print(f"{path[-24:]:>24} {'off':>8} {len(reference):>7} {'':>8} {'':>7} {'':>6} {'':>9} "
+              f"{passes / len(frames):>7.0%} {reference_cost * 1000:>9.2f}")
+
+        for refresh_interval in args.refresh or [2, 3, 5]:
+            onsets, ears, cost, passes = run(frames, timestamps, classifier, refresh_interval, predictor)
+            matched = sum(1 for t in reference if any(abs(t - u) <= MATCH_TOLERANCE for u in onsets))
+            extra = sum(1 for u in onsets if not any(abs(t - u) <= MATCH_TOLERANCE for t in reference))
+            recall = matched / len(reference) if reference else 1.0
+            ear_diff = np.nanmean(np.abs(ears - reference_ears))
+            print(f"{'':>24} {refresh_interval:>8} {len(onsets):>7} {matched:>8} {recall:>7.0%} {extra:>6} "
+                  f"{ear_diff:>9.4f} {passes / len(frames):>7.0%} {cost * 1000:>9.2f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Benchmark reduced-size grayscale decoding of MJPEG frames against the normal capture path.
+
+Takes MJPEG video files, e.g. recorded straight from a webcam with
+  ffmpeg -f v4l2 -input_format mjpeg -video_size 1280x720 -i /dev/video0 -c copy webcam.avi
+and times, per frame at the processing resolution:
+  full     cap.read() decoding to full-size BGR, then resize and cvtColor
+  reduced  raw JPEG from cap.read() with CAP_PROP_FORMAT -1, decoded at 1/2-1/8 size to grayscale
+  preview  the same, decoded to color, as while the video preview is on
+The mean absolute difference between the full and reduced grayscale frames
+shows how close the two paths' inputs to the detector are. Rows for the
+same processing resolution compare capture sizes: the live detector asks
+the camera for the processing resolution, so the decode at 1/2-1/8 size
+only runs when the camera delivers more than that.
+
+Capturing at 320x240 and processing at 320x240, the grayscale decode took
+0.34 ms per frame against 0.60 ms for normal capture. Capturing 640x480 and
+decoding at 1/2 took 0.74-0.87 ms, so the reduced sizes only pay off when a
+camera delivers larger frames than asked for, or the governor lowers the
+resolution.
+"""
+
+import argparse
+import sys
+import time
+
+import cv2
+import numpy as np
+
+import blink_detector
+
+def read_full(path, resolution):
+    capture = cv2.VideoCapture(path)
+    frames = []
+    start = time.perf_counter()
+    while True:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        frame = blink_detector.resize_frame(frame, resolution)
+        frames.append(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY))
+    elapsed = time.perf_counter() - start
+    capture.release()
+    return frames, elapsed
+
+def read_reduced(path, resolution, color):
+    capture = cv2.VideoCapture(path)
+    capture.set(cv2.CAP_PROP_FORMAT, -1)
+    frames = []
+    start = time.perf_counter()
+    while True:
+        ret, raw = capture.read()
+        if not ret:
+            break
+        frame = blink_detector.decode_mjpeg_frame(raw, resolution, color)
+        frames.append(blink_detector.resize_frame(frame, resolution))
+    elapsed = time.perf_counter() - start
+    capture.release()
+    return frames, elapsed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("videos", nargs="+", help="MJPEG video files")
+    parser.add_argument("--resolution", type=int, nargs=2, action="append",
+                        help="Processing resolution(s) (default: 320x240 and 640x480)")
+    args = parser.parse_args()
+
+    print(f"{'video':>24} {'camera':>10} {'process':>9} {'full ms':>8} {'reduced':>8} {'preview':>8} {'speedup':>8} {'diff':>6}")
+    for path in args.videos:
+        capture = cv2.VideoCapture(path)
+        capture.set(cv2.CAP_PROP_FORMAT, -1)
+        ret, raw = capture.read()
+        capture.release()
+        if not ret or not blink_detector.is_jpeg_buffer(raw):
+            print(f"ERROR: {path} does not contain MJPEG frames")
+            sys.exit(1)
+        first = cv2.imdecode(raw, cv2.IMREAD_GRAYSCALE)
+        blink_detector.camera_frame_size = (first.shape[1], first.shape[0])
+
+        for resolution in args.resolution or [(320, 240), (640, 480)]:
+            resolution = tuple(resolution)
+            # Warm the file cache so the first path timed is not penalized
+            read_full(path, resolution)
+            full, full_time = read_full(path, resolution)
+            reduced, reduced_time = read_reduced(path, resolution, False)
+            _, preview_time = read_reduced(path, resolution, True)
+
+            count = len(full)
+            diff = float(np.mean([np.mean(cv2.absdiff(a, b)) for a, b in zip(full, reduced)]))
+            camera = f"{first.shape[1]}x{first.shape[0]}"
+            process = f"{resolution[0]}x{resolution[1]}"
+            print(f"{path[-24:]:>24} {camera:>10} {process:>9} {1000 * full_time / count:>8.2f} "
+                  f"{1000 * reduced_time / count:>8.2f} {1000 * preview_time / count:>8.2f} "
+                  f"{full_time / reduced_time:>7.2f}x {diff:>6.2f}")
+
+if __name__ == "__main__":
+    main()
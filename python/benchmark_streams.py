@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Benchmark multi-stream mode: memory and throughput as the stream count grows.
+
+Every stream replays the same frames from memory so decode cost does not skew
+the numbers. Pass --video with a recording of a face for realistic landmark
+load; without it a synthetic frame is used and only face detection runs.
+RSS is reported without that frame cache, which a detector reading a camera
+does not hold; "N procs MB" is the one-stream figure times the stream count,
+what running one detector process per stream would cost.
+"""
+
+import argparse
+import sys
+import time
+
+import cv2
+import numpy as np
+
+import blink_detector
+
+class ReplayCapture:
+    """Minimal cv2.VideoCapture stand-in that loops over in-memory frames."""
+    def __init__(self, frames):
+        self.frames = frames
+        self.index = 0
+
+    def isOpened(self):
+        return True
+
+    def read(self):
+        frame = self.frames[self.index]
+        self.index = (self.index + 1) % len(self.frames)
+        return True, frame
+
+    def release(self):
+        pass
+
+def load_frames(video_path, max_frames=300):
+    if video_path is None:
+        frame = np.full((240, 320, 3), 128, dtype=np.uint8)
+        cv2.circle(frame, (160, 120), 60, (200, 200, 200), -1)
+        return [frame]
+
+    capture = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < max_frames:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        frames.append(frame)
+    capture.release()
+
+    if not frames:
+        print(f"ERROR: No frames could be read from {video_path}")
+        sys.exit(1)
+    return frames
+
+def run_pool(predictor, frames, stream_count, workers, duration):
+    pool = blink_detector.StreamPool(predictor, workers)
+    streams = []
+    for i in range(stream_count):
+        # fps is set high so each stream is limited only by the pool
+        stream = blink_detector.CaptureStream(f"bench-{i}", None, fps=1e6, capture=ReplayCapture(frames))
+        streams.append(stream)
+
+    pool.start()
+    start = time.time()
+    for stream in streams:
+        pool.add_stream(stream)
+    time.sleep(duration)
+    rss = blink_detector.get_rss_bytes()
+    elapsed = time.time() - start
+    counts = [stream.frames_processed for stream in streams]
+    pool.stop()
+
+    return {
+        "streams": stream_count,
+        "total_fps": sum(counts) / elapsed,
+        "min_stream_fps": min(counts) / elapsed,
+        "max_stream_fps": max(counts) / elapsed,
+        "rss_mb": rss / (1024 * 1024),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--video", help="Video file to replay on every stream")
+    parser.add_argument("--max-streams", type=int, default=8)
+    parser.add_argument("--workers", type=int, default=blink_detector.STREAM_WORKERS)
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per stream count")
+    args = parser.parse_args()
+
+    # Output from the workers is not part of what is being measured
+    blink_detector.emit = lambda message: None
+
+    rss_before = blink_detector.get_rss_bytes()
+    _, predictor = blink_detector.load_models()
+    model_mb = (blink_detector.get_rss_bytes() - rss_before) / (1024 * 1024)
+    frames = load_frames(args.video)
+    cache_mb = sum(frame.nbytes for frame in frames) / (1024 * 1024)
+
+    print(f"Model load added {model_mb:.1f} MB RSS, {args.workers} workers, {len(frames)} frames per stream "
+          f"({cache_mb:.1f} MB, left out of RSS below)")
+    print(f"{'streams':>8} {'total fps':>10} {'min/stream':>11} {'max/stream':>11} {'RSS MB':>8} {'N procs MB':>11}")
+
+    single_process_mb = None
+    stream_count = 1
+    while stream_count <= args.max_streams:
+        result = run_pool(predictor, frames, stream_count, args.workers, args.duration)
+        result["rss_mb"] -= cache_mb
+        if single_process_mb is None:
+            single_process_mb = result["rss_mb"]
+
+        # What the same load costs today: one detector process per stream
+        print(f"{result['streams']:>8} {result['total_fps']:>10.1f} {result['min_stream_fps']:>11.1f} "
+              f"{result['max_stream_fps']:>11.1f} {result['rss_mb']:>8.1f} {single_process_mb * stream_count:>11.1f}")
+        stream_count *= 2
+
+if __name__ == "__main__":
+    main()
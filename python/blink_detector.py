@@ -9,8 +9,19 @@ from pathlib import Path
 import threading
 import queue
 import base64
-from collections import deque
+from collections import deque, namedtuple
+import heapq
+import atexit
 import statistics
+import gc
+import math
+import socket
+import tempfile
+import argparse
+import _thread
+from concurrent.futures import ThreadPoolExecutor
+
+from blink_log import BlinkLog
 
 # Core detection parameters
 BLINK_COOLDOWN = 0.3
@@ -53,33 +64,447 @@ BLINK_DURATION_MAX = 0.6
 BLINK_RECOVERY_THRESHOLD = 0.7
 BASELINE_WINDOW_SIZE = 15
 
+# Optional baseline taken as a quantile of a decaying EAR histogram instead of the
+# weighted mean of the last BASELINE_WINDOW_SIZE samples. Samples inside a blink
+# are held back and dropped once it counts as one, so blinks do not drag the
+# baseline down, and the horizon can be much longer at the same per-frame cost.
+BASELINE_QUANTILE_ENABLED = False
+BASELINE_QUANTILE = 0.5
+BASELINE_QUANTILE_HORIZON = 20.0  # seconds
+BASELINE_HISTOGRAM_BINS = 128
+BASELINE_HISTOGRAM_MAX_EAR = 0.64
+
+# Optional per-eye alpha-beta filter over EAR and its velocity. Smooths landmark
+# jitter and lets blink onset/offset be interpolated between samples, so short
+# single-frame EAR dips no longer pass the minimum duration check at low FPS.
+EAR_FILTER_ENABLED = False
+EAR_FILTER_TIME_CONSTANT = 0.04
+EAR_FILTER_MAX_GAP = 0.5
+EAR_CLOSURE_VELOCITY = -1.0  # EAR units per second
+
+# Optional optical-flow tracking of the 12 eye landmarks between full predictor
+# passes. The predictor re-anchors every LANDMARK_REFRESH_INTERVAL frames, or
+# sooner when the forward-backward flow error exceeds FLOW_MAX_FB_ERROR pixels.
+# The landmark_tracking command enables it with an interval (benchmark_tracking.py).
+LANDMARK_TRACKING_ENABLED = False
+LANDMARK_REFRESH_INTERVAL = 1
+FLOW_MAX_FB_ERROR = 0.8
+FLOW_PATCH_MARGIN = 12
+FLOW_LK_PARAMS = dict(winSize=(9, 9), maxLevel=2,
+                      criteria=(cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 10, 0.03))
+
+# Optional eye-patch openness classifier. The predictor re-anchors every
+# EYE_CLASSIFIER_REFRESH_INTERVAL frames; in between the classifier scores
+# fixed-size patches at the last known eye landmarks, and the score is mapped to
+# an EAR-equivalent so the blink state machine sees one fused signal.
+EYE_CLASSIFIER_ENABLED = False
+EYE_CLASSIFIER_REFRESH_INTERVAL = 3
+EYE_CLASSIFIER_MODEL = 'eye_openness.npz'
+EYE_PATCH_SIZE = (24, 16)
+EYE_CLOSED_EAR_RATIO = 0.4
+
 # System state
 SEND_VIDEO = False
 CAMERA_ACTIVE = False
 cap = None
+# Rate the open capture was last asked for
+camera_fps = None
 command_queue = queue.Queue()
 target_fps = TARGET_FPS
 processing_resolution = PROCESSING_RESOLUTION
-last_blink_display_time = 0.0
-
-# Detection state - tracks blink progress and baseline
-baseline_ear_values = deque(maxlen=BASELINE_WINDOW_SIZE)
-current_baseline_ear = 0.0
-blink_in_progress = False
-blink_start_time = 0.0
-last_blink_time = 0.0
-baseline_smoothing_factor = 0.3
-max_drop_percentage = 0.0
-
-_cached_json_strings = {
-    "no_face_data": json.dumps({"faceData": {
-        "faceDetected": False,
-        "ear": 0.0,
-        "blink": False,
-        "faceRect": {"x": 0, "y": 0, "width": 0, "height": 0},
-        "eyeLandmarks": []
-    }})
-}
+
+# Multi-stream mode: one process, one predictor, N capture sources
+STREAM_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))
+STREAM_MAX_READ_FAILURES = 50
+face_detector = None
+landmark_predictor = None
+stream_pool = None
+
+# Models load in the background on the first start_camera and are released
+# after the camera has been stopped this long (None keeps them loaded)
+MODEL_IDLE_UNLOAD_SECONDS = 300.0
+model_lock = threading.Lock()
+model_loader = None
+
+# Durable blink history, enabled by the blink_log command with a directory
+blink_log = None
+
+# Daemon mode (--daemon) exits after this long with no client attached
+DAEMON_IDLE_SHUTDOWN = 1800.0
+
+# CPU-budget governor: quality ladder from full quality down to cheapest.
+# Each rung is (face_detect_interval, resolution_scale, fps_scale). Frames
+# between face detections are landmark-only and reuse the last face rectangle.
+GOVERNOR_LADDER = [
+    (1, 1.0, 1.0),
+    (2, 1.0, 1.0),
+    (4, 1.0, 1.0),
+    (4, 0.75, 1.0),
+    (4, 0.75, 0.75),
+    (6, 0.5, 0.75),
+    (6, 0.5, 0.5),
+]
+GOVERNOR_WINDOW = 2.0
+GOVERNOR_HEADROOM = 0.7
+
+class EarFilter:
+    """Alpha-beta filter tracking one eye's EAR and its velocity.
+    
+    Gains follow the sample spacing so smoothing is the same in time at any
+    FPS: alpha from the time constant, beta from the critically damped
+    relation beta = alpha^2 / (2 - alpha).
+    """
+    def __init__(self, time_constant=EAR_FILTER_TIME_CONSTANT):
+        self.time_constant = time_constant
+        self.reset()
+
+    def reset(self):
+        self.ear = None
+        self.velocity = 0.0
+        self.last_time = None
+
+    def update(self, measured_ear, current_time):
+        if self.ear is None or current_time - self.last_time > EAR_FILTER_MAX_GAP:
+            self.ear = measured_ear
+            self.velocity = 0.0
+            self.last_time = current_time
+            return self.ear, self.velocity
+        
+        dt = max(current_time - self.last_time, 1e-3)
+        alpha = 1.0 - np.exp(-dt / self.time_constant)
+        beta = alpha * alpha / (2.0 - alpha)
+        
+        predicted = self.ear + self.velocity * dt
+        residual = measured_ear - predicted
+        self.ear = predicted + alpha * residual
+        self.velocity += beta * residual / dt
+        self.last_time = current_time
+        return self.ear, self.velocity
+
+class BlinkConfig:
+    """Thresholds for one blink state machine; fields not given follow the BLINK_* constants.
+    
+    drop_threshold_scale multiplies the adaptive EAR drop threshold.
+    """
+    FIELDS = ("cooldown", "min_absolute_drop", "drop_threshold_scale", "duration_min", "duration_max",
+              "recovery_threshold", "closure_velocity", "baseline_smoothing", "baseline_quantile")
+    
+    def __init__(self, name="primary", **overrides):
+        unknown = set(overrides) - set(self.FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown blink config fields: {', '.join(sorted(unknown))}")
+        self.name = name
+        self.cooldown = overrides.get("cooldown", BLINK_COOLDOWN)
+        self.min_absolute_drop = overrides.get("min_absolute_drop", BLINK_MIN_ABSOLUTE_EAR_DROP)
+        self.drop_threshold_scale = overrides.get("drop_threshold_scale", 1.0)
+        self.duration_min = overrides.get("duration_min", BLINK_DURATION_MIN)
+        self.duration_max = overrides.get("duration_max", BLINK_DURATION_MAX)
+        self.recovery_threshold = overrides.get("recovery_threshold", BLINK_RECOVERY_THRESHOLD)
+        self.closure_velocity = overrides.get("closure_velocity", EAR_CLOSURE_VELOCITY)
+        self.baseline_smoothing = overrides.get("baseline_smoothing", 0.3)
+        self.baseline_quantile = bool(overrides.get("baseline_quantile", BASELINE_QUANTILE_ENABLED))
+
+    def describe(self):
+        return {"name": self.name, **{field: getattr(self, field) for field in self.FIELDS}}
+
+class QuantileBaseline:
+    """Streaming quantile of EAR over a fixed-bin histogram with exponential forgetting.
+    
+    Memory is constant and adding a sample is O(1): rather than decaying every
+    bin, each sample is added with a weight growing as exp(t / horizon), and
+    the bins are rescaled only when that weight gets large. Samples can be
+    held while a blink is in progress, then committed if it turns out not to
+    be one or discarded if it is.
+    """
+    def __init__(self, quantile=BASELINE_QUANTILE, horizon=BASELINE_QUANTILE_HORIZON):
+        self.quantile = quantile
+        self.horizon = horizon
+        self.bin_width = BASELINE_HISTOGRAM_MAX_EAR / BASELINE_HISTOGRAM_BINS
+        self.counts = np.zeros(BASELINE_HISTOGRAM_BINS)
+        self.pending = deque(maxlen=64)
+        self.reset()
+
+    def reset(self):
+        self.counts[:] = 0.0
+        self.pending.clear()
+        self.total = 0.0
+        self.samples = 0
+        self.origin = None
+
+    def add(self, ear, current_time):
+        if self.origin is None:
+            self.origin = current_time
+        weight = math.exp((current_time - self.origin) / self.horizon)
+        if weight > 1e6:
+            self.counts /= weight
+            self.total /= weight
+            self.origin = current_time
+            weight = 1.0
+        index = min(max(int(ear / self.bin_width), 0), BASELINE_HISTOGRAM_BINS - 1)
+        self.counts[index] += weight
+        self.total += weight
+        self.samples += 1
+
+    def hold(self, ear, current_time):
+        self.pending.append((ear, current_time))
+
+    def commit(self):
+        for ear, current_time in self.pending:
+            self.add(ear, current_time)
+        self.pending.clear()
+
+    def discard(self):
+        self.pending.clear()
+
+    def value(self):
+        """The quantile interpolated within its bin, or None before 5 samples."""
+        if self.samples < 5:
+            return None
+        cumulative = np.cumsum(self.counts)
+        target = self.quantile * self.total
+        index = min(int(np.searchsorted(cumulative, target)), BASELINE_HISTOGRAM_BINS - 1)
+        below = cumulative[index] - self.counts[index]
+        fraction = (target - below) / self.counts[index] if self.counts[index] > 0 else 0.5
+        return (index + fraction) * self.bin_width
+
+class BlinkState:
+    """Detection state for one stream - tracks blink progress and baseline.
+    
+    With a BlinkConfig the state machine uses its thresholds instead of the
+    module constants.
+    """
+    def __init__(self, config=None):
+        self.config = config
+        self.baseline_ear_values = deque(maxlen=BASELINE_WINDOW_SIZE)
+        self.quantile_baseline = QuantileBaseline()
+        self.left_filter = EarFilter()
+        self.right_filter = EarFilter()
+        self.reset()
+
+    def reset(self):
+        self.baseline_ear_values.clear()
+        self.quantile_baseline.reset()
+        self.left_filter.reset()
+        self.right_filter.reset()
+        self.previous_ear = None
+        self.previous_time = None
+        self.current_baseline_ear = 0.0
+        self.blink_in_progress = False
+        self.blink_start_time = 0.0
+        self.last_blink_time = 0.0
+        self.baseline_smoothing_factor = 0.3 if self.config is None else self.config.baseline_smoothing
+        self.max_drop_percentage = 0.0
+        self.last_blink_display_time = 0.0
+
+blink_state = BlinkState()
+
+# Filled on first use so importing the module does no serialization work
+_cached_json_strings = {}
+
+def get_no_face_line():
+    line = _cached_json_strings.get("no_face_data")
+    if line is None:
+        line = _cached_json_strings["no_face_data"] = json.dumps({"faceData": {
+            "faceDetected": False,
+            "ear": 0.0,
+            "blink": False,
+            "faceRect": {"x": 0, "y": 0, "width": 0, "height": 0},
+            "eyeLandmarks": []
+        }})
+    return line
+
+# Output is written by a dedicated thread so a slow stdout reader never stalls detection
+OUTPUT_DEBUG_QUEUE_SIZE = 256
+OUTPUT_STATS_INTERVAL = 5.0
+
+class StdoutWriter:
+    """Writes JSON lines to stdout from a background thread with a priority drop policy.
+    
+    Blink events, errors, status and other control messages are never dropped.
+    faceData and videoStream messages are coalesced per stream, so only the
+    latest pending one is written. Debug lines go to a bounded queue that
+    drops its oldest entry when full. Lines leave in the order they were
+    queued; a coalesced message keeps its original place in the order.
+    When anything was dropped or coalesced an "output" message with the
+    counters is written, at most once per OUTPUT_STATS_INTERVAL.
+    With interrupt_main_on_close set, a failed write to the current stream
+    interrupts the main thread, so a detector whose reader has gone away
+    shuts down and releases the camera instead of running on unseen.
+    """
+    def __init__(self, stream=None, max_debug=OUTPUT_DEBUG_QUEUE_SIZE):
+        self.stream = stream
+        self.max_debug = max_debug
+        self.interrupt_main_on_close = False
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._critical = deque()
+        self._debug = deque()
+        self._latest = {}
+        self._thread = None
+        self._closed = False
+        self._busy = False
+        self._last_stats_time = 0.0
+        self._reported = None
+        self.counters = {"written": 0, "debug_dropped": 0, "coalesced": 0, "max_backlog": 0, "write_errors": 0}
+
+    def put(self, message):
+        if isinstance(message, str):
+            # Pre-serialized lines are the cached no-face faceData
+            kind, key, line = "coalesce", ("faceData", None), message
+        else:
+            line = json.dumps(message)
+            if "faceData" in message:
+                kind, key = "coalesce", ("faceData", message.get("stream"))
+            elif "videoStream" in message:
+                kind, key = "coalesce", ("videoStream", message.get("stream"))
+            elif "debug" in message and "error" not in message:
+                kind, key = "debug", None
+            else:
+                kind, key = "critical", None
+        
+        with self._cond:
+            if self._closed:
+                return
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="stdout-writer", daemon=True)
+                self._thread.start()
+            
+            self._seq += 1
+            if kind == "coalesce":
+                slot = self._latest.get(key)
+                if slot is not None:
+                    slot[1] = line
+                    self.counters["coalesced"] += 1
+                    return
+                self._latest[key] = [self._seq, line]
+            elif kind == "debug":
+                if len(self._debug) >= self.max_debug:
+                    self._debug.popleft()
+                    self.counters["debug_dropped"] += 1
+                self._debug.append((self._seq, line))
+            else:
+                self._critical.append((self._seq, line))
+            
+            backlog = len(self._critical) + len(self._debug) + len(self._latest)
+            if backlog > self.counters["max_backlog"]:
+                self.counters["max_backlog"] = backlog
+            self._cond.notify()
+
+    def _drain(self):
+        # Merge the three sources back into queue order
+        entries = list(self._critical) + list(self._debug) + [tuple(slot) for slot in self._latest.values()]
+        self._critical.clear()
+        self._debug.clear()
+        self._latest.clear()
+        entries.sort()
+        return [line for _, line in entries]
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while not (self._critical or self._debug or self._latest):
+                    self._busy = False
+                    self._cond.notify_all()
+                    self._cond.wait()
+                self._busy = True
+                lines = self._drain()
+                stats = self._stats_line()
+                if stats:
+                    lines.append(stats)
+                self.counters["written"] += len(lines)
+                stream = self.stream or sys.stdout
+            
+            try:
+                stream.write("\n".join(lines) + "\n")
+                stream.flush()
+            except (OSError, ValueError):
+                with self._cond:
+                    self.counters["write_errors"] += 1
+                    if self.stream is not None and self.stream is not stream:
+                        # Failed on a stream that has since been replaced
+                        continue
+                    # Reader is gone; nothing more can be delivered
+                    self._closed = True
+                    self._busy = False
+                    self._thread = None
+                    self._cond.notify_all()
+                    interrupt = self.interrupt_main_on_close
+                if interrupt:
+                    _thread.interrupt_main()
+                return
+
+    def _stats_line(self):
+        now = time.time()
+        dropped = (self.counters["debug_dropped"], self.counters["coalesced"])
+        if dropped == self._reported or dropped == (0, 0) or now - self._last_stats_time < OUTPUT_STATS_INTERVAL:
+            return None
+        self._reported = dropped
+        self._last_stats_time = now
+        return json.dumps({"output": dict(self.counters)})
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self.counters)
+            stats["backlog"] = len(self._critical) + len(self._debug) + len(self._latest)
+            return stats
+
+    def set_stream(self, stream):
+        """Write to stream from now on, discarding anything still queued for the old one."""
+        with self._cond:
+            self.stream = stream
+            self._critical.clear()
+            self._debug.clear()
+            self._latest.clear()
+            self._closed = False
+            self._cond.notify_all()
+
+    def flush(self, timeout=2.0):
+        """Block until everything queued so far has been written."""
+        deadline = time.time() + timeout
+        with self._cond:
+            while (self._critical or self._debug or self._latest or self._busy) and not self._closed:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+output_writer = StdoutWriter()
+atexit.register(output_writer.flush)
+
+def emit(message):
+    output_writer.put(message)
+
+def get_rss_bytes():
+    """Current resident set size of this process in bytes, or 0 if unavailable."""
+    try:
+        if sys.platform.startswith("linux"):
+            with open("/proc/self/statm") as f:
+                return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+        if sys.platform == "win32":
+            import ctypes
+            from ctypes import wintypes
+            
+            class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+                _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD),
+                            ("PeakWorkingSetSize", ctypes.c_size_t), ("WorkingSetSize", ctypes.c_size_t),
+                            ("QuotaPeakPagedPoolUsage", ctypes.c_size_t), ("QuotaPagedPoolUsage", ctypes.c_size_t),
+                            ("QuotaPeakNonPagedPoolUsage", ctypes.c_size_t), ("QuotaNonPagedPoolUsage", ctypes.c_size_t),
+                            ("PagefileUsage", ctypes.c_size_t), ("PeakPagefileUsage", ctypes.c_size_t)]
+            
+            counters = PROCESS_MEMORY_COUNTERS()
+            counters.cb = ctypes.sizeof(counters)
+            handle = ctypes.windll.kernel32.GetCurrentProcess()
+            if ctypes.windll.psapi.GetProcessMemoryInfo(handle, ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize
+            return 0
+        # macOS has no current-RSS call in the standard library, ask ps
+        import subprocess
+        out = subprocess.run(["ps", "-o", "rss=", "-p", str(os.getpid())],
+                             capture_output=True, text=True, timeout=2).stdout
+        return int(out.strip()) * 1024
+    except Exception:
+        return 0
 
 # Pre-allocated buffers for performance
 class PreallocatedBuffers:
@@ -90,8 +515,7 @@ class PreallocatedBuffers:
         self.temp_frame = None
         self.ear_diffs = np.zeros((3, 2), dtype=np.float32)
         self.ear_distances = np.zeros(3, dtype=np.float32)
-        self.concatenated_eyes = np.zeros((12, 2), dtype=np.int32)
-        self.normalized_landmarks = [{"x": 0.0, "y": 0.0} for _ in range(12)]
+        self.concatenated_eyes = np.zeros((12, 2), dtype=np.float32)
 
 def calculate_ear_fast(eye_points, buffers):
     buffers.ear_diffs[0] = eye_points[1] - eye_points[5]
@@ -116,6 +540,150 @@ def get_eye_landmarks_only(predictor, gray, face, buffers):
     
     return buffers.left_eye, buffers.right_eye
 
+def landmark_refresh_interval():
+    # The longest re-anchor interval among the enabled features; with both off the predictor runs every frame
+    interval = LANDMARK_REFRESH_INTERVAL if LANDMARK_TRACKING_ENABLED else 1
+    if EYE_CLASSIFIER_ENABLED:
+        interval = max(interval, EYE_CLASSIFIER_REFRESH_INTERVAL)
+    return interval
+
+class EyeLandmarkTracker:
+    """Propagates the 12 eye landmarks with pyramidal Lucas-Kanade flow.
+    
+    Flow runs only on a patch around both eyes, cut as a view of the gray
+    frame. Points are tracked forward and back again, and any lost point or a
+    round trip error above FLOW_MAX_FB_ERROR drops the track so the caller
+    falls back to a full predictor pass.
+    """
+    def __init__(self):
+        self.points = np.zeros((12, 1, 2), dtype=np.float32)
+        self.left_eye = np.zeros((6, 2), dtype=np.float32)
+        self.right_eye = np.zeros((6, 2), dtype=np.float32)
+        self.tracked_frames = 0
+        self.anchored_frames = 0
+        self.forced_refreshes = 0
+        self.reset()
+
+    def reset(self):
+        self.prev_gray = None
+        self.frames_since_anchor = 0
+
+    def needs_refresh(self):
+        return self.prev_gray is None or self.frames_since_anchor >= landmark_refresh_interval() - 1
+
+    def hold(self, gray):
+        # Keep the anchored points in place, for the classifier without flow
+        self.prev_gray = gray
+        self.frames_since_anchor += 1
+        self.left_eye[:] = self.points[:6, 0]
+        self.right_eye[:] = self.points[6:, 0]
+        return self.left_eye, self.right_eye
+
+    def anchor(self, gray, left_eye, right_eye):
+        self.points[:6, 0] = left_eye
+        self.points[6:, 0] = right_eye
+        self.prev_gray = gray
+        self.frames_since_anchor = 0
+        self.anchored_frames += 1
+
+    def track(self, gray):
+        if self.prev_gray is None or self.prev_gray.shape != gray.shape:
+            self.prev_gray = None
+            return None
+        
+        height, width = gray.shape
+        x0 = max(int(self.points[:, 0, 0].min()) - FLOW_PATCH_MARGIN, 0)
+        y0 = max(int(self.points[:, 0, 1].min()) - FLOW_PATCH_MARGIN, 0)
+        x1 = min(int(self.points[:, 0, 0].max()) + FLOW_PATCH_MARGIN + 1, width)
+        y1 = min(int(self.points[:, 0, 1].max()) + FLOW_PATCH_MARGIN + 1, height)
+        if x1 - x0 < 8 or y1 - y0 < 8:
+            self.prev_gray = None
+            return None
+        
+        prev_patch = self.prev_gray[y0:y1, x0:x1]
+        patch = gray[y0:y1, x0:x1]
+        origin = np.array([x0, y0], dtype=np.float32)
+        start = self.points - origin
+        
+        forward, status, _ = cv2.calcOpticalFlowPyrLK(prev_patch, patch, start, None, **FLOW_LK_PARAMS)
+        backward, back_status, _ = cv2.calcOpticalFlowPyrLK(patch, prev_patch, forward, None, **FLOW_LK_PARAMS)
+        fb_error = np.abs(backward - start).max() if status.all() and back_status.all() else np.inf
+        if fb_error > FLOW_MAX_FB_ERROR:
+            self.prev_gray = None
+            self.forced_refreshes += 1
+            return None
+        
+        self.points[:] = forward + origin
+        self.prev_gray = gray
+        self.frames_since_anchor += 1
+        self.tracked_frames += 1
+        self.left_eye[:] = self.points[:6, 0]
+        self.right_eye[:] = self.points[6:, 0]
+        return self.left_eye, self.right_eye
+
+EYE_PATCH_CELL = 4
+EYE_PATCH_BINS = 9
+# Cell index of every patch pixel, so a HOG histogram is a single bincount
+_eye_patch_cells = ((np.arange(EYE_PATCH_SIZE[1])[:, None] // EYE_PATCH_CELL) * (EYE_PATCH_SIZE[0] // EYE_PATCH_CELL) +
+                    np.arange(EYE_PATCH_SIZE[0])[None, :] // EYE_PATCH_CELL).ravel() * EYE_PATCH_BINS
+_eye_patch_hog_size = (EYE_PATCH_SIZE[0] // EYE_PATCH_CELL) * (EYE_PATCH_SIZE[1] // EYE_PATCH_CELL) * EYE_PATCH_BINS
+
+def extract_eye_patch(gray, eye_points):
+    """Crop a 3:2 box around one eye from the gray frame and resize it to EYE_PATCH_SIZE."""
+    center_x, center_y = eye_points.mean(axis=0)
+    width = float(np.hypot(*(eye_points[3] - eye_points[0])))
+    x0 = int(max(center_x - 0.75 * width, 0))
+    x1 = int(min(center_x + 0.75 * width, gray.shape[1]))
+    y0 = int(max(center_y - 0.5 * width, 0))
+    y1 = int(min(center_y + 0.5 * width, gray.shape[0]))
+    if x1 - x0 < 6 or y1 - y0 < 4:
+        return None
+    return cv2.resize(gray[y0:y1, x0:x1], EYE_PATCH_SIZE, interpolation=cv2.INTER_LINEAR)
+
+def eye_patch_features(patch):
+    # HOG captures the lid edge, the normalized row profile captures the dark iris band
+    gx = cv2.Sobel(patch, cv2.CV_32F, 1, 0, ksize=1)
+    gy = cv2.Sobel(patch, cv2.CV_32F, 0, 1, ksize=1)
+    magnitude, angle = cv2.cartToPolar(gx, gy, angleInDegrees=True)
+    bins = (angle.ravel() % 180.0 * (EYE_PATCH_BINS / 180.0)).astype(np.int32) % EYE_PATCH_BINS
+    hog = np.bincount(_eye_patch_cells + bins, weights=magnitude.ravel(), minlength=_eye_patch_hog_size)
+    hog /= np.linalg.norm(hog) + 1e-6
+    rows = patch.mean(axis=1, dtype=np.float32)
+    rows -= rows.mean()
+    rows /= rows.std() + 1e-6
+    return np.concatenate([hog.astype(np.float32), rows])
+
+class EyeOpennessClassifier:
+    """Logistic regression over eye patch features. A score of 1.0 is open, 0.0 is closed."""
+    def __init__(self, weights, bias, mean, scale):
+        self.weights = np.asarray(weights, dtype=np.float32)
+        self.bias = float(bias)
+        self.mean = np.asarray(mean, dtype=np.float32)
+        self.scale = np.asarray(scale, dtype=np.float32)
+
+    @classmethod
+    def load(cls, path):
+        data = np.load(path)
+        return cls(data['weights'], data['bias'], data['mean'], data['scale'])
+
+    def save(self, path):
+        np.savez(path, weights=self.weights, bias=self.bias, mean=self.mean, scale=self.scale)
+
+    def score_features(self, features):
+        logits = ((features - self.mean) / self.scale) @ self.weights + self.bias
+        return 1.0 / (1.0 + np.exp(-logits))
+
+    def score(self, gray, eye_points):
+        patch = extract_eye_patch(gray, eye_points)
+        if patch is None:
+            return None
+        return float(self.score_features(eye_patch_features(patch)))
+
+def openness_to_ear(openness, reference_ear):
+    return reference_ear * (EYE_CLOSED_EAR_RATIO + (1.0 - EYE_CLOSED_EAR_RATIO) * openness)
+
+eye_classifier = None
+
 _encode_params = [cv2.IMWRITE_JPEG_QUALITY, 70]
 def encode_frame(frame):
     _, buffer = cv2.imencode('.jpg', frame, _encode_params)
@@ -132,23 +700,66 @@ def calculate_baseline_ear(ear_values):
     
     return weighted_sum / total_weight
 
-def detect_blink_advanced(current_ear, current_time):
-    global baseline_ear_values, current_baseline_ear, blink_in_progress, blink_start_time, last_blink_time, max_drop_percentage
+def filter_ear(left_ear, right_ear, current_time, state):
+    left_ear, left_velocity = state.left_filter.update(left_ear, current_time)
+    right_ear, right_velocity = state.right_filter.update(right_ear, current_time)
+    return (left_ear + right_ear) * 0.5, (left_velocity + right_velocity) * 0.5
+
+def interpolate_crossing(t0, ear0, t1, ear1, level):
+    # Time at which the straight line between two samples crosses level
+    if t0 is None or ear0 is None or ear1 == ear0:
+        return t1
+    fraction = (ear0 - level) / (ear0 - ear1)
+    return t0 + min(1.0, max(0.0, fraction)) * (t1 - t0)
+
+def detect_blink_advanced(current_ear, current_time, state=None, ear_velocity=None):
+    """Advance the blink state machine by one EAR sample.
     
-    baseline_ear_values.append(current_ear)
+    When ear_velocity is given (filtered mode) a fast closure can open a blink
+    at half the usual drop, and blink onset and offset are interpolated
+    between samples instead of snapping to frame times.
+    """
+    if state is None:
+        state = blink_state
     
-    # Update baseline with exponential smoothing for responsive adaptation
-    if len(baseline_ear_values) >= 5:
-        new_baseline = calculate_baseline_ear(baseline_ear_values)
-        if new_baseline:
-            if current_baseline_ear > 0:
-                current_baseline_ear = (baseline_smoothing_factor * new_baseline + 
-                                      (1 - baseline_smoothing_factor) * current_baseline_ear)
-            else:
-                current_baseline_ear = new_baseline
+    config = state.config
+    if config is None:
+        cooldown, min_absolute_drop, drop_threshold_scale = BLINK_COOLDOWN, BLINK_MIN_ABSOLUTE_EAR_DROP, 1.0
+        duration_min, duration_max = BLINK_DURATION_MIN, BLINK_DURATION_MAX
+        recovery_threshold, closure_velocity = BLINK_RECOVERY_THRESHOLD, EAR_CLOSURE_VELOCITY
+        quantile_baseline = state.quantile_baseline if BASELINE_QUANTILE_ENABLED else None
     else:
-        return False, None
+        cooldown, min_absolute_drop, drop_threshold_scale = config.cooldown, config.min_absolute_drop, config.drop_threshold_scale
+        duration_min, duration_max = config.duration_min, config.duration_max
+        recovery_threshold, closure_velocity = config.recovery_threshold, config.closure_velocity
+        quantile_baseline = state.quantile_baseline if config.baseline_quantile else None
+    
+    previous_ear, previous_time = state.previous_ear, state.previous_time
+    state.previous_ear, state.previous_time = current_ear, current_time
     
+    if quantile_baseline is not None:
+        # Baseline from earlier samples only; this one joins the histogram below unless it is part of a blink
+        new_baseline = quantile_baseline.value()
+        if new_baseline is None:
+            quantile_baseline.add(current_ear, current_time)
+            return False, None
+        state.current_baseline_ear = new_baseline
+    else:
+        state.baseline_ear_values.append(current_ear)
+        
+        # Update baseline with exponential smoothing for responsive adaptation
+        if len(state.baseline_ear_values) >= 5:
+            new_baseline = calculate_baseline_ear(state.baseline_ear_values)
+            if new_baseline:
+                if state.current_baseline_ear > 0:
+                    state.current_baseline_ear = (state.baseline_smoothing_factor * new_baseline + 
+                                                  (1 - state.baseline_smoothing_factor) * state.current_baseline_ear)
+                else:
+                    state.current_baseline_ear = new_baseline
+        else:
+            return False, None
+    
+    current_baseline_ear = state.current_baseline_ear
     if current_baseline_ear <= 0:
         return False, None
         
@@ -156,175 +767,614 @@ def detect_blink_advanced(current_ear, current_time):
     ear_drop_absolute = current_baseline_ear - current_ear
     
     # Get adaptive threshold based on baseline EAR size
-    adaptive_threshold = get_adaptive_ear_drop_threshold(current_baseline_ear)
+    adaptive_threshold = get_adaptive_ear_drop_threshold(current_baseline_ear) * drop_threshold_scale
+    onset_ear = current_baseline_ear * (1 - adaptive_threshold)
+    
+    closing_fast = (ear_velocity is not None and 
+                    ear_velocity < closure_velocity and 
+                    ear_drop_percentage > adaptive_threshold * 0.5)
     
     # Start blink detection when both percentage and absolute drop thresholds are met
-    if (not blink_in_progress and 
-        ear_drop_percentage > adaptive_threshold and 
-        ear_drop_absolute > BLINK_MIN_ABSOLUTE_EAR_DROP and 
+    if (not state.blink_in_progress and 
+        (ear_drop_percentage > adaptive_threshold or closing_fast) and 
+        ear_drop_absolute > min_absolute_drop and 
         ear_drop_percentage > 0):
-        blink_in_progress = True
-        blink_start_time = current_time
-        max_drop_percentage = ear_drop_percentage
-        return False, {"baseline": current_baseline_ear, "drop": ear_drop_percentage, "phase": "start", "threshold": adaptive_threshold}
+        state.blink_in_progress = True
+        state.blink_start_time = current_time
+        if ear_velocity is not None:
+            state.blink_start_time = interpolate_crossing(previous_time, previous_ear, current_time, current_ear, onset_ear)
+        state.max_drop_percentage = ear_drop_percentage
+        if quantile_baseline is not None:
+            quantile_baseline.hold(current_ear, current_time)
+        return False, {"baseline": current_baseline_ear, "drop": ear_drop_percentage, "phase": "start", "threshold": adaptive_threshold,
+                       "onset": state.blink_start_time}
     
     # Track maximum drop and validate blink completion
-    elif blink_in_progress:
-        if ear_drop_percentage > max_drop_percentage:
-            max_drop_percentage = ear_drop_percentage
+    elif state.blink_in_progress:
+        if ear_drop_percentage > state.max_drop_percentage:
+            state.max_drop_percentage = ear_drop_percentage
+        if quantile_baseline is not None:
+            quantile_baseline.hold(current_ear, current_time)
         
-        blink_duration = current_time - blink_start_time
+        blink_duration = current_time - state.blink_start_time
+        recovery_ear = current_baseline_ear * recovery_threshold
         
         # End blink when eye recovers or duration exceeds limit
-        if current_ear > current_baseline_ear * BLINK_RECOVERY_THRESHOLD or blink_duration > BLINK_DURATION_MAX:
+        if current_ear > recovery_ear or blink_duration > duration_max:
+            blink_end_time = current_time
+            if ear_velocity is not None and current_ear > recovery_ear:
+                # Offset is interpolated at the onset level too, so the duration is the width of the dip at one
+                # level; an eye still below it on this sample ends the blink here
+                blink_end_time = interpolate_crossing(previous_time, previous_ear, current_time, current_ear, onset_ear)
+                blink_duration = blink_end_time - state.blink_start_time
+            
             # Only register as valid blink if both percentage and absolute drop thresholds are met
-            if (BLINK_DURATION_MIN <= blink_duration <= BLINK_DURATION_MAX and 
-                max_drop_percentage > adaptive_threshold and
-                (current_baseline_ear * max_drop_percentage) > BLINK_MIN_ABSOLUTE_EAR_DROP):
-                if (current_time - last_blink_time) > BLINK_COOLDOWN:
-                    last_blink_time = current_time
-                    blink_in_progress = False
+            blink_shaped = (duration_min <= blink_duration <= duration_max and 
+                            state.max_drop_percentage > adaptive_threshold and
+                            (current_baseline_ear * state.max_drop_percentage) > min_absolute_drop)
+            if quantile_baseline is not None:
+                # Blink samples stay out of the baseline; anything else was just low EAR
+                if blink_shaped:
+                    quantile_baseline.discard()
+                else:
+                    quantile_baseline.commit()
+            
+            if blink_shaped:
+                if (current_time - state.last_blink_time) > cooldown:
+                    state.last_blink_time = current_time
+                    state.blink_in_progress = False
                     
                     # Calculate the actual EAR value at maximum drop for accurate reporting
-                    max_drop_ear = current_baseline_ear * (1 - max_drop_percentage)
+                    max_drop_ear = current_baseline_ear * (1 - state.max_drop_percentage)
                     
                     return True, {
                         "baseline": current_baseline_ear,
-                        "drop": max_drop_percentage,
+                        "drop": state.max_drop_percentage,
                         "max_drop_ear": max_drop_ear,
                         "duration": blink_duration,
+                        "onset": state.blink_start_time,
+                        "offset": blink_end_time,
                         "phase": "complete",
                         "threshold": adaptive_threshold
                     }
             
-            blink_in_progress = False
-            max_drop_percentage = 0.0
+            state.blink_in_progress = False
+            state.max_drop_percentage = 0.0
+    
+    elif quantile_baseline is not None:
+        quantile_baseline.add(current_ear, current_time)
     
     return False, {"baseline": current_baseline_ear, "drop": ear_drop_percentage, "phase": "monitoring", "threshold": adaptive_threshold}
 
 def reset_blink_detection():
-    global baseline_ear_values, current_baseline_ear, blink_in_progress, blink_start_time, last_blink_time, baseline_smoothing_factor, max_drop_percentage
-    baseline_ear_values.clear()
-    current_baseline_ear = 0.0
-    blink_in_progress = False
-    blink_start_time = 0.0
-    last_blink_time = 0.0
-    baseline_smoothing_factor = 0.3
-    max_drop_percentage = 0.0
+    blink_state.reset()
+    if shadow_evaluator is not None:
+        shadow_evaluator.reset()
 
-def find_available_camera():
-    print(json.dumps({"debug": "Starting camera detection..."}))
-    sys.stdout.flush()
+# Shadow mode: alternative configs run on the primary's EAR samples and only report counters
+SHADOW_MATCH_WINDOW = 0.3
+SHADOW_REPORT_INTERVAL = 60.0
+
+class ShadowEvaluator:
+    """Runs alternative BlinkConfigs on the same EAR samples as the primary state machine.
+    
+    Each config gets its own BlinkState. A shadow blink whose onset is within
+    SHADOW_MATCH_WINDOW of a primary blink onset counts as agreement; the
+    rest count as primary-only or shadow-only. Shadow blinks are never emitted.
+    primary_config is the primary state machine's BlinkConfig, None for the
+    BLINK_* constants.
+    """
+    def __init__(self, configs, primary_config=None):
+        primary_duration_max = BLINK_DURATION_MAX if primary_config is None else primary_config.duration_max
+        self.shadows = []
+        for config in configs:
+            self.shadows.append({
+                "config": config,
+                "state": BlinkState(config),
+                # Either side reports a blink at its end, up to its duration_max after the onset
+                "horizon": SHADOW_MATCH_WINDOW + max(primary_duration_max, config.duration_max),
+                "pending_primary": deque(),
+                "pending_shadow": deque(),
+                "counters": {"blinks": 0, "agree": 0, "primary_only": 0, "shadow_only": 0},
+            })
+        self.primary_blinks = 0
+        self.frames = 0
+        self.cost = 0.0
+        self.last_report_time = None
+
+    def reset(self):
+        for shadow in self.shadows:
+            shadow["state"].reset()
+            shadow["pending_primary"].clear()
+            shadow["pending_shadow"].clear()
+
+    def update(self, ear, current_time, ear_velocity=None, primary_onset=None):
+        start = time.perf_counter()
+        if primary_onset is not None:
+            self.primary_blinks += 1
+        
+        for shadow in self.shadows:
+            pending_primary, pending_shadow = shadow["pending_primary"], shadow["pending_shadow"]
+            counters = shadow["counters"]
+            if primary_onset is not None:
+                pending_primary.append(primary_onset)
+            
+            blink, info = detect_blink_advanced(ear, current_time, shadow["state"], ear_velocity)
+            if blink:
+                counters["blinks"] += 1
+                pending_shadow.append(info["onset"])
+            
+            # Pair blinks in onset order, then expire those that can no longer be paired
+            while pending_primary and pending_shadow:
+                primary, other = pending_primary[0], pending_shadow[0]
+                if abs(primary - other) <= SHADOW_MATCH_WINDOW:
+                    pending_primary.popleft()
+                    pending_shadow.popleft()
+                    counters["agree"] += 1
+                elif primary < other:
+                    pending_primary.popleft()
+                    counters["primary_only"] += 1
+                else:
+                    pending_shadow.popleft()
+                    counters["shadow_only"] += 1
+            horizon = current_time - shadow["horizon"]
+            while pending_primary and pending_primary[0] < horizon:
+                pending_primary.popleft()
+                counters["primary_only"] += 1
+            while pending_shadow and pending_shadow[0] < horizon:
+                pending_shadow.popleft()
+                counters["shadow_only"] += 1
+        
+        self.frames += 1
+        self.cost += time.perf_counter() - start
+
+    def report(self, now, force=False):
+        """Counters since shadow mode was enabled, at most once per SHADOW_REPORT_INTERVAL."""
+        if self.last_report_time is None:
+            self.last_report_time = now
+        if not force and now - self.last_report_time < SHADOW_REPORT_INTERVAL:
+            return None
+        self.last_report_time = now
+        
+        configs = []
+        for shadow in self.shadows:
+            counters = shadow["counters"]
+            compared = counters["agree"] + counters["primary_only"] + counters["shadow_only"]
+            configs.append({**shadow["config"].describe(), **counters,
+                            "agreement": round(counters["agree"] / compared, 3) if compared else None})
+        return {
+            "frames": self.frames,
+            "primary_blinks": self.primary_blinks,
+            "cost_us_per_config": round(1e6 * self.cost / max(1, self.frames * len(self.shadows)), 2),
+            "configs": configs,
+        }
+
+shadow_evaluator = None
+
+def set_shadow_configs(specs):
+    global shadow_evaluator
+    
+    configs = []
+    for i, spec in enumerate(specs or []):
+        overrides = dict(spec)
+        name = str(overrides.pop('name', f"shadow-{i + 1}"))
+        try:
+            configs.append(BlinkConfig(name, **overrides))
+        except ValueError as e:
+            emit({"error": f"Invalid shadow config {name}: {str(e)}"})
+            return
+    
+    # Final counters of the configs being replaced
+    if shadow_evaluator is not None:
+        emit({"shadow": shadow_evaluator.report(time.time(), force=True)})
+    if not configs:
+        shadow_evaluator = None
+        emit({"status": "Shadow mode disabled"})
+        return
+    shadow_evaluator = ShadowEvaluator(configs, blink_state.config)
+    emit({"status": f"Shadow mode enabled with {len(configs)} configs"})
+
+# Frame-quality gate: cheap checks on each face's eye band before the landmark predictor.
+# Faces that fail skip landmarking and leave a gap in the EAR signal instead of a
+# sample that could read as a blink. Sharpness is the Laplacian variance relative to
+# the band's own variance, so it does not depend on exposure.
+QUALITY_MIN_SHARPNESS = 0.04
+QUALITY_MIN_BRIGHTNESS = 40
+QUALITY_MAX_BRIGHTNESS = 220
+QUALITY_MIN_CONTRAST = 15.0
+QUALITY_MIN_FACE_SIZE = 40
+QUALITY_MIN_VISIBLE = 0.85
+QUALITY_REPORT_INTERVAL = 60.0
+
+class FrameQualityGate:
+    """Decides per face whether landmarking is worthwhile, and counts what it skipped.
     
+    check() measures views of the gray frame only and returns None for a
+    usable face or the name of the first failed check. The CPU saved is
+    estimated from the landmark step's measured cost on faces that passed,
+    less the cost of the checks themselves.
+    """
+    def __init__(self):
+        self.checked = 0
+        self.skipped = {}
+        self.check_seconds = 0.0
+        self.landmarked = 0
+        self.landmark_seconds = 0.0
+        self.last_report_time = None
+
+    def check(self, gray, face):
+        start = time.perf_counter()
+        reason = self._check(gray, face)
+        self.check_seconds += time.perf_counter() - start
+        self.checked += 1
+        if reason is not None:
+            self.skipped[reason] = self.skipped.get(reason, 0) + 1
+        return reason
+
+    def _check(self, gray, face):
+        height, width = gray.shape[:2]
+        if min(face.width(), face.height()) < QUALITY_MIN_FACE_SIZE:
+            return "small"
+        
+        # A face cut off by the frame edge gives landmarks a guess for the missing part
+        left, right = max(face.left(), 0), min(face.right(), width)
+        top, bottom = max(face.top(), 0), min(face.bottom(), height)
+        if (right - left) * (bottom - top) < QUALITY_MIN_VISIBLE * face.width() * face.height():
+            return "truncated"
+        
+        # The eyes lie in this band of dlib's face rectangle
+        band = gray[max(face.top() + face.height() // 5, 0):min(face.top() + face.height() * 11 // 20, height), left:right]
+        if band.size == 0:
+            return "truncated"
+        mean, std = cv2.meanStdDev(band)
+        mean, std = mean[0, 0], std[0, 0]
+        if mean < QUALITY_MIN_BRIGHTNESS:
+            return "dark"
+        if mean > QUALITY_MAX_BRIGHTNESS:
+            return "bright"
+        if std < QUALITY_MIN_CONTRAST:
+            return "low_contrast"
+        _, laplacian_std = cv2.meanStdDev(cv2.Laplacian(band, cv2.CV_16S))
+        if (laplacian_std[0, 0] / std) ** 2 < QUALITY_MIN_SHARPNESS:
+            return "blur"
+        return None
+
+    def record_landmarking(self, seconds):
+        self.landmarked += 1
+        self.landmark_seconds += seconds
+
+    def report(self, now, force=False):
+        """Counters since the gate was enabled, at most once per QUALITY_REPORT_INTERVAL."""
+        if self.last_report_time is None:
+            self.last_report_time = now
+        if not force and now - self.last_report_time < QUALITY_REPORT_INTERVAL:
+            return None
+        self.last_report_time = now
+        
+        skipped = sum(self.skipped.values())
+        landmark_cost = self.landmark_seconds / self.landmarked if self.landmarked else 0.0
+        return {
+            "faces": self.checked,
+            "skipped": skipped,
+            "skip_rate": round(skipped / self.checked, 4) if self.checked else 0.0,
+            "reasons": dict(self.skipped),
+            "check_us": round(1e6 * self.check_seconds / max(1, self.checked), 1),
+            "landmark_us": round(1e6 * landmark_cost, 1),
+            "cpu_saved_ms": round(1000 * (skipped * landmark_cost - self.check_seconds), 1),
+        }
+
+quality_gate = None
+
+def set_quality_gate(enabled):
+    global quality_gate
+    
+    if quality_gate is not None:
+        emit({"quality": quality_gate.report(time.time(), force=True)})
+    quality_gate = FrameQualityGate() if enabled else None
+    emit({"status": f"Frame quality gate {'enabled' if enabled else 'disabled'}"})
+
+def get_camera_backends():
     # Platform-specific backends for maximum compatibility
     if sys.platform == "win32":
-        backends = [cv2.CAP_DSHOW, cv2.CAP_MSMF, cv2.CAP_ANY]
+        return [cv2.CAP_DSHOW, cv2.CAP_MSMF, cv2.CAP_ANY]
     elif sys.platform == "darwin":
-        backends = [cv2.CAP_AVFOUNDATION, cv2.CAP_ANY]
+        return [cv2.CAP_AVFOUNDATION, cv2.CAP_ANY]
     else:
-        backends = [cv2.CAP_V4L2, cv2.CAP_ANY]
+        return [cv2.CAP_V4L2, cv2.CAP_ANY]
+
+def find_available_camera():
+    emit({"debug": "Starting camera detection..."})
     
-    for backend in backends:
-        print(json.dumps({"debug": f"Testing backend: {backend}"}))
-        sys.stdout.flush()
+    for backend in get_camera_backends():
+        emit({"debug": f"Testing backend: {backend}"})
         
         for i in range(5):
-            print(json.dumps({"debug": f"Trying camera index {i} with backend {backend}"}))
-            sys.stdout.flush()
+            emit({"debug": f"Trying camera index {i} with backend {backend}"})
             
             try:
                 cap_test = cv2.VideoCapture(i, backend)
                 if cap_test.isOpened():
-                    ret, test_frame = cap_test.read()
+                    probe = probe_read(cap_test)
+                    if probe is None:
+                        emit({"debug": f"Camera {i} opened but did not deliver a frame in time"})
+                        continue
+                    ret, test_frame = probe
                     cap_test.release()
                     
                     if ret and test_frame is not None:
-                        print(json.dumps({"debug": f"Success! Camera {i} working with backend {backend}"}))
-                        print(json.dumps({"status": f"Found working camera at index {i}"}))
-                        sys.stdout.flush()
+                        emit({"debug": f"Success! Camera {i} working with backend {backend}"})
+                        emit({"status": f"Found working camera at index {i}"})
                         return i, backend
                     else:
-                        print(json.dumps({"debug": f"Camera {i} opened but cannot read frames"}))
-                        sys.stdout.flush()
+                        emit({"debug": f"Camera {i} opened but cannot read frames"})
                 else:
-                    print(json.dumps({"debug": f"Failed to open camera {i} with backend {backend}"}))
-                    sys.stdout.flush()
+                    emit({"debug": f"Failed to open camera {i} with backend {backend}"})
             except Exception as e:
-                print(json.dumps({"debug": f"Exception testing camera {i} with backend {backend}: {str(e)}"}))
-                sys.stdout.flush()
+                emit({"debug": f"Exception testing camera {i} with backend {backend}: {str(e)}"})
     
-    print(json.dumps({"debug": "No working camera found after trying all options"}))
-    sys.stdout.flush()
+    emit({"debug": "No working camera found after trying all options"})
     return None, None
 
+# Camera loss detection and hot-reconnect
+CAMERA_LOST_READ_FAILURES = 5
+CAMERA_READ_TIMEOUT = 2.0
+CAMERA_RECONNECT_INITIAL_DELAY = 0.1
+CAMERA_RECONNECT_MAX_DELAY = 5.0
+CAMERA_RECONNECT_GIVE_UP = 120.0
+camera_device = None
+camera_device_node = None
+camera_reconnect = None
+
+# Optional raw MJPEG capture: JPEG frames are decoded straight to grayscale, at 1/2-1/8 size
+# when larger than needed; cameras that cannot hand out compressed frames use normal capture.
+MJPEG_DECODE_ENABLED = False
+camera_raw_mjpeg = False
+camera_frame_size = None
+_REDUCED_GRAYSCALE = {1: cv2.IMREAD_GRAYSCALE, 2: cv2.IMREAD_REDUCED_GRAYSCALE_2,
+                      4: cv2.IMREAD_REDUCED_GRAYSCALE_4, 8: cv2.IMREAD_REDUCED_GRAYSCALE_8}
+_REDUCED_COLOR = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2,
+                  4: cv2.IMREAD_REDUCED_COLOR_4, 8: cv2.IMREAD_REDUCED_COLOR_8}
+
+def is_jpeg_buffer(frame):
+    return (frame is not None and frame.dtype == np.uint8 and frame.size > 2 and
+            (frame.ndim == 1 or frame.shape[0] == 1) and frame.flat[0] == 0xFF and frame.flat[1] == 0xD8)
+
+def enable_raw_mjpeg(capture):
+    """Ask an open capture for undecoded MJPEG frames; False if the backend cannot hand them out."""
+    capture.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*"MJPG"))
+    return capture.set(cv2.CAP_PROP_FORMAT, -1)
+
+def jpeg_frame_size(raw):
+    """Full (width, height) of a raw camera JPEG, or None if raw is not one."""
+    if not is_jpeg_buffer(raw):
+        return None
+    full = cv2.imdecode(raw, cv2.IMREAD_GRAYSCALE)
+    if full is None:
+        return None
+    return full.shape[1], full.shape[0]
+
+def decode_mjpeg_frame(raw, resolution, color=False):
+    """Decode a raw camera JPEG at the smallest DCT scale that still covers resolution; None if corrupt."""
+    width, height = camera_frame_size
+    scale = 1
+    while scale < 8 and width // (scale * 2) >= resolution[0] and height // (scale * 2) >= resolution[1]:
+        scale *= 2
+    return cv2.imdecode(raw, (_REDUCED_COLOR if color else _REDUCED_GRAYSCALE)[scale])
+
+class CaptureReader:
+    """Runs cap.read() on a daemon thread so a read that hangs in the driver can time out.
+    
+    A reader that timed out is abandoned with its stuck thread; use a new one.
+    """
+    def __init__(self):
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        self.abandoned = False
+        self._thread = threading.Thread(target=self._run, name="capture-reader", daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            capture = self._requests.get()
+            if capture is None:
+                return
+            try:
+                result = capture.read()
+            except cv2.error:
+                result = (False, None)
+            self._results.put(result)
+
+    def read(self, capture, timeout=None):
+        """Return (ret, frame), or None if the read did not finish within timeout."""
+        self._requests.put(capture)
+        try:
+            return self._results.get(timeout=timeout or CAMERA_READ_TIMEOUT)
+        except queue.Empty:
+            self.abandoned = True
+            return None
+
+    def close(self):
+        """Let the thread exit once its current read, if any, returns."""
+        self._requests.put(None)
+
+def probe_read(capture):
+    """Read one frame with CAMERA_READ_TIMEOUT; None if the read hung.
+    
+    Probing runs on the main thread, so a device that shows up but never
+    delivers a frame must not block it. A hung capture is released in the
+    background and must not be used again.
+    """
+    reader = CaptureReader()
+    result = reader.read(capture, CAMERA_READ_TIMEOUT)
+    reader.close()
+    if result is None:
+        release_stuck_capture(capture)
+    return result
+
+def release_stuck_capture(capture):
+    # A capture stuck in read may block in release as well
+    threading.Thread(target=capture.release, daemon=True).start()
+
+def open_camera_device(camera_index, backend, raw_mjpeg=None):
+    """Open a camera, check it delivers a frame and apply the capture settings; None on failure."""
+    global camera_device, camera_device_node, camera_raw_mjpeg, camera_frame_size, camera_fps
+    
+    capture = cv2.VideoCapture(camera_index, backend)
+    probe = probe_read(capture)
+    if probe is None:
+        emit({"debug": f"Camera {camera_index} did not deliver a frame within {CAMERA_READ_TIMEOUT}s"})
+        return None
+    ret, test_frame = probe
+    if not ret or test_frame is None:
+        capture.release()
+        return None
+    
+    capture.set(cv2.CAP_PROP_FRAME_WIDTH, processing_resolution[0])
+    capture.set(cv2.CAP_PROP_FRAME_HEIGHT, processing_resolution[1])
+    capture.set(cv2.CAP_PROP_FPS, target_fps)
+    camera_fps = target_fps
+    
+    camera_raw_mjpeg = False
+    if MJPEG_DECODE_ENABLED if raw_mjpeg is None else raw_mjpeg:
+        frame_size = None
+        if enable_raw_mjpeg(capture):
+            probe = probe_read(capture)
+            if probe is None:
+                return None
+            frame_size = jpeg_frame_size(probe[1]) if probe[0] else None
+        if frame_size is None:
+            emit({"debug": "Camera cannot deliver raw MJPEG frames, using normal capture"})
+            # The capture may be left half switched; start over without raw frames
+            capture.release()
+            return open_camera_device(camera_index, backend, raw_mjpeg=False)
+        camera_raw_mjpeg = True
+        camera_frame_size = frame_size
+        emit({"debug": f"Raw MJPEG capture at {frame_size[0]}x{frame_size[1]}"})
+    
+    camera_device = (camera_index, backend)
+    # Linux shows unplugging as the device node disappearing; elsewhere only reads fail
+    node = f"/dev/video{camera_index}"
+    camera_device_node = node if sys.platform.startswith("linux") and os.path.exists(node) else None
+    return capture
+
+def camera_device_present():
+    return camera_device_node is None or os.path.exists(camera_device_node)
+
+def camera_lost(reason):
+    """Drop the capture and start reconnecting, with one event instead of an error per frame."""
+    global cap, camera_reconnect
+    
+    emit({"camera": {"event": "lost", "reason": reason, "device": camera_device[0] if camera_device else None}})
+    if cap is not None:
+        if reason == "read_timeout":
+            release_stuck_capture(cap)
+        else:
+            cap.release()
+        cap = None
+    
+    now = time.time()
+    camera_reconnect = {"lost_at": now, "attempts": 0, "next_attempt": now + CAMERA_RECONNECT_INITIAL_DELAY}
+
+def try_reconnect_camera():
+    """Make one reconnect attempt if it is due; return True once the camera is back.
+    
+    The previous device is tried first on every attempt and full discovery on
+    every third, with exponential backoff between attempts. After
+    CAMERA_RECONNECT_GIVE_UP seconds the camera is stopped with an error.
+    """
+    global cap, camera_reconnect
+    
+    now = time.time()
+    if now < camera_reconnect["next_attempt"]:
+        return False
+    
+    camera_reconnect["attempts"] += 1
+    attempts = camera_reconnect["attempts"]
+    capture = None
+    try:
+        if camera_device is not None:
+            capture = open_camera_device(*camera_device)
+        if capture is None and attempts % 3 == 0:
+            camera_index, backend = find_available_camera()
+            if camera_index is not None:
+                capture = open_camera_device(camera_index, backend)
+    except cv2.error as e:
+        emit({"debug": f"Camera reconnect attempt {attempts} failed: {str(e)}"})
+    
+    if capture is not None:
+        cap = capture
+        downtime = time.time() - camera_reconnect["lost_at"]
+        camera_reconnect = None
+        reset_blink_detection()
+        emit({"camera": {"event": "recovered", "device": camera_device[0], "attempts": attempts,
+                         "downtime": round(downtime, 3)}})
+        return True
+    
+    if now - camera_reconnect["lost_at"] > CAMERA_RECONNECT_GIVE_UP:
+        stop_camera()
+        emit({"error": f"Failed to reconnect camera after {attempts} attempts"})
+        return False
+    
+    delay = min(CAMERA_RECONNECT_MAX_DELAY, CAMERA_RECONNECT_INITIAL_DELAY * 2 ** attempts)
+    camera_reconnect["next_attempt"] = now + delay
+    return False
+
 def start_camera():
     global cap, CAMERA_ACTIVE
     
-    print(json.dumps({"debug": "start_camera() called"}))
-    sys.stdout.flush()
+    emit({"debug": "start_camera() called"})
     
     if CAMERA_ACTIVE:
-        print(json.dumps({"debug": "Camera already active"}))
-        sys.stdout.flush()
+        emit({"debug": "Camera already active"})
         return True
     
     # Retry logic for robust camera initialization
     max_retries = 10  
     retry_delay = 2   
     for attempt in range(max_retries):
-        print(json.dumps({"debug": f"Camera start attempt {attempt + 1}/{max_retries}"}))
-        sys.stdout.flush()
+        emit({"debug": f"Camera start attempt {attempt + 1}/{max_retries}"})
         
-        camera_index, backend = find_available_camera()
+        reused = attempt == 0 and camera_device is not None
+        if reused:
+            # The device that worked last time usually still does; skip probing every index
+            camera_index, backend = camera_device
+        else:
+            camera_index, backend = find_available_camera()
         if camera_index is None:
-            print(json.dumps({"debug": f"No working camera found on attempt {attempt + 1}"}))
-            sys.stdout.flush()
+            emit({"debug": f"No working camera found on attempt {attempt + 1}"})
             if attempt < max_retries - 1:
                 time.sleep(retry_delay)
                 continue
             else:
-                print(json.dumps({"error": "No working camera found after all attempts"}))
-                sys.stdout.flush()
+                emit({"error": "No working camera found after all attempts"})
                 return False
         
         try:
-            cap = cv2.VideoCapture(camera_index, backend)
-            
-            ret, test_frame = cap.read()
-            if not ret or test_frame is None:
-                print(json.dumps({"debug": f"Camera opened but cannot read frames on attempt {attempt + 1}"}))
-                sys.stdout.flush()
-                cap.release()
-                cap = None
+            cap = open_camera_device(camera_index, backend)
+            if cap is None:
+                emit({"debug": f"Camera opened but cannot read frames on attempt {attempt + 1}"})
                 if attempt < max_retries - 1:
-                    time.sleep(retry_delay)
+                    if not reused:
+                        time.sleep(retry_delay)
                     continue
                 else:
-                    print(json.dumps({"error": "Camera opened but cannot read frames after all attempts"}))
-                    sys.stdout.flush()
+                    emit({"error": "Camera opened but cannot read frames after all attempts"})
                     return False
             
-            cap.set(cv2.CAP_PROP_FRAME_WIDTH, processing_resolution[0])
-            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, processing_resolution[1])
-            cap.set(cv2.CAP_PROP_FPS, target_fps)
-            
             actual_width = cap.get(cv2.CAP_PROP_FRAME_WIDTH)
             actual_height = cap.get(cv2.CAP_PROP_FRAME_HEIGHT)
             actual_fps = cap.get(cv2.CAP_PROP_FPS)
-            print(json.dumps({"debug": f"Camera resolution set to: {actual_width}x{actual_height}, FPS: {actual_fps}"}))
-            sys.stdout.flush()
+            emit({"debug": f"Camera resolution set to: {actual_width}x{actual_height}, FPS: {actual_fps}"})
             
             CAMERA_ACTIVE = True
-            print(json.dumps({"status": "Camera opened successfully"}))
-            sys.stdout.flush()
+            emit_memory_status("Camera opened successfully")
             
             reset_blink_detection()
             
             return True
             
         except Exception as e:
-            print(json.dumps({"debug": f"Exception starting camera on attempt {attempt + 1}: {str(e)}"}))
-            sys.stdout.flush()
+            emit({"debug": f"Exception starting camera on attempt {attempt + 1}: {str(e)}"})
             if cap is not None:
                 cap.release()
                 cap = None
@@ -333,256 +1383,1314 @@ def start_camera():
                 time.sleep(retry_delay)
                 continue
             else:
-                print(json.dumps({"error": f"Failed to start camera after all attempts: {str(e)}"}))
-                sys.stdout.flush()
+                emit({"error": f"Failed to start camera after all attempts: {str(e)}"})
                 return False
     
     return False
 
 def stop_camera():
-    global cap, CAMERA_ACTIVE
+    global cap, CAMERA_ACTIVE, camera_reconnect
     
-    print(json.dumps({"debug": "stop_camera() called"}))
-    sys.stdout.flush()
+    emit({"debug": "stop_camera() called"})
     
+    camera_reconnect = None
     if cap is not None:
         cap.release()
         cap = None
     
     CAMERA_ACTIVE = False
-    print(json.dumps({"status": "Camera released"}))
-    sys.stdout.flush()
+    emit_memory_status("Camera released")
 
 def input_thread():
-    print(json.dumps({"debug": "Input thread started"}))
-    sys.stdout.flush()
+    emit({"debug": "Input thread started"})
     
     while True:
         try:
             line = sys.stdin.readline()
-            if line:
-                command_queue.put(line.strip())
-                print(json.dumps({"debug": f"Received command: {line.strip()}"}))
-                sys.stdout.flush()
+            if not line:
+                # stdin closed: the app is gone, so stop the camera and exit
+                emit({"debug": "Input closed"})
+                _thread.interrupt_main()
+                break
+            command_queue.put(line.strip())
+            emit({"debug": f"Received command: {line.strip()}"})
         except Exception as e:
-            print(json.dumps({"debug": f"Input thread error: {str(e)}"}))
-            sys.stdout.flush()
+            emit({"debug": f"Input thread error: {str(e)}"})
             break
 
 def process_commands():
-    global SEND_VIDEO, target_fps, processing_resolution
+    global SEND_VIDEO, target_fps, processing_resolution, EAR_FILTER_ENABLED, LANDMARK_TRACKING_ENABLED, MODEL_IDLE_UNLOAD_SECONDS
+    global LANDMARK_REFRESH_INTERVAL
+    global BASELINE_QUANTILE_ENABLED, MJPEG_DECODE_ENABLED
     
     while not command_queue.empty():
         try:
             line = command_queue.get_nowait()
             data = json.loads(line)
             
-            print(json.dumps({"debug": f"Processing command: {data}"}))
-            sys.stdout.flush()
+            emit({"debug": f"Processing command: {data}"})
             
             if 'target_fps' in data:
+                # The main loop passes the new rate on to the capture
                 target_fps = int(data['target_fps'])
-                if CAMERA_ACTIVE and cap is not None:
-                    cap.set(cv2.CAP_PROP_FPS, target_fps)
-                print(json.dumps({"status": f"Updated target FPS to {target_fps}"}))
-                sys.stdout.flush()
+                emit({"status": f"Updated target FPS to {target_fps}"})
             elif 'processing_resolution' in data:
                 processing_resolution = tuple(data['processing_resolution'])
-                print(json.dumps({"status": f"Updated processing resolution to {processing_resolution}"}))
-                sys.stdout.flush()
+                emit({"status": f"Updated processing resolution to {processing_resolution}"})
             elif 'request_video' in data:
                 SEND_VIDEO = True
-                print(json.dumps({"status": "Video streaming enabled"}))
-                sys.stdout.flush()
+                emit({"status": "Video streaming enabled"})
             elif 'start_camera' in data:
+                # Model loading overlaps with camera probing and bring-up
+                load_models_async()
                 if start_camera():
-                    print(json.dumps({"status": "Camera started successfully"}))
+                    emit({"status": "Camera started successfully"})
                 else:
-                    print(json.dumps({"error": "Failed to start camera"}))
-                sys.stdout.flush()
+                    emit({"error": "Failed to start camera"})
             elif 'stop_camera' in data:
                 stop_camera()
                 SEND_VIDEO = False
-                print(json.dumps({"status": "Camera stopped"}))
-                sys.stdout.flush()
+                emit({"status": "Camera stopped"})
+            elif 'ear_filter' in data:
+                EAR_FILTER_ENABLED = bool(data['ear_filter'])
+                reset_blink_detection()
+                emit({"status": f"EAR filter {'enabled' if EAR_FILTER_ENABLED else 'disabled'}"})
+            elif 'baseline_quantile' in data:
+                BASELINE_QUANTILE_ENABLED = bool(data['baseline_quantile'])
+                reset_blink_detection()
+                emit({"status": f"Quantile baseline {'enabled' if BASELINE_QUANTILE_ENABLED else 'disabled'}"})
+            elif 'eye_classifier' in data:
+                if enable_eye_classifier(data['eye_classifier']):
+                    landmark_tracker.reset()
+                    emit({"status": f"Eye classifier {'enabled' if EYE_CLASSIFIER_ENABLED else 'disabled'}",
+                          "refresh_interval": EYE_CLASSIFIER_REFRESH_INTERVAL})
+            elif 'landmark_tracking' in data:
+                tracking = data['landmark_tracking']
+                # Tracking is enabled with a refresh interval; false or 0 disables it
+                if tracking and (isinstance(tracking, bool) or not isinstance(tracking, (int, float)) or tracking < 2):
+                    emit({"error": "Landmark tracking needs a refresh interval of at least 2 frames"})
+                else:
+                    if tracking:
+                        LANDMARK_REFRESH_INTERVAL = int(tracking)
+                    LANDMARK_TRACKING_ENABLED = bool(tracking)
+                    landmark_tracker.reset()
+                    emit({"status": f"Landmark tracking {'enabled' if LANDMARK_TRACKING_ENABLED else 'disabled'}",
+                          "refresh_interval": LANDMARK_REFRESH_INTERVAL})
+            elif 'model_idle_unload' in data:
+                seconds = data['model_idle_unload']
+                MODEL_IDLE_UNLOAD_SECONDS = float(seconds) if seconds else None
+                emit({"status": f"Updated model idle unload to {MODEL_IDLE_UNLOAD_SECONDS}"})
+            elif 'mjpeg_decode' in data:
+                MJPEG_DECODE_ENABLED = bool(data['mjpeg_decode'])
+                emit({"status": f"Raw MJPEG decode {'enabled' if MJPEG_DECODE_ENABLED else 'disabled'}"
+                                f"{', applies from the next camera start' if CAMERA_ACTIVE else ''}"})
+            elif 'quality_gate' in data:
+                set_quality_gate(bool(data['quality_gate']))
+            elif 'shadow_configs' in data:
+                set_shadow_configs(data['shadow_configs'])
+            elif 'blink_log' in data:
+                open_blink_log(data['blink_log'])
+            elif 'blink_log_query' in data:
+                query_blink_log(data['blink_log_query'])
+            elif 'output_stats' in data:
+                emit({"output": output_writer.stats()})
+            elif 'cpu_budget' in data:
+                budget = data['cpu_budget']
+                report = cpu_governor.set_budget(float(budget) if budget else None)
+                emit({"governor": report})
+                emit({"status": f"Updated CPU budget to {cpu_governor.budget_percent}"})
+            elif 'start_streams' in data:
+                start_streams(data['start_streams'], data.get('workers'))
+            elif 'stop_streams' in data:
+                stream_ids = data['stop_streams']
+                stop_streams(stream_ids if isinstance(stream_ids, list) else None)
         except json.JSONDecodeError as e:
-            print(json.dumps({"debug": f"JSON decode error: {str(e)}"}))
-            sys.stdout.flush()
+            emit({"debug": f"JSON decode error: {str(e)}"})
         except Exception as e:
-            print(json.dumps({"debug": f"Command processing error: {str(e)}"}))
-            sys.stdout.flush()
+            emit({"debug": f"Command processing error: {str(e)}"})
 
-def main():
-    global SEND_VIDEO, CAMERA_ACTIVE, cap, last_blink_display_time
+def open_blink_log(directory):
+    """Switch the blink log to directory, or close it when directory is empty."""
+    global blink_log
     
-    print(json.dumps({"status": "Starting blink detector in standby mode..."}))
-    sys.stdout.flush()
+    if blink_log is not None:
+        blink_log.close()
+        blink_log = None
+    if not directory:
+        return
     
-    detector = dlib.get_frontal_face_detector()
+    try:
+        blink_log = BlinkLog(directory)
+        emit({"status": f"Blink log opened at {directory}"})
+    except (OSError, ValueError) as e:
+        emit({"error": f"Failed to open blink log: {str(e)}"})
+
+def query_blink_log(query):
+    # Answered straight from the memory-mapped log files
+    if blink_log is None:
+        emit({"error": "Blink log is not open"})
+        return
     
+    start = time.perf_counter()
+    end_time = float(query['end']) if query.get('end') is not None else time.time()
+    start_time = float(query['start']) if query.get('start') is not None else end_time - 86400
+    if query.get('events'):
+        result = {"events": blink_log.query_events(start_time, end_time, int(query.get('limit', 10000)))}
+    else:
+        result = blink_log.query_minutes(start_time, end_time, float(query.get('bucket', 60)))
+    result["id"] = query.get('id')
+    result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+    emit({"blinkLog": result})
+
+def get_model_path(filename):
     # Model path handling for both development and bundled scenarios
     if getattr(sys, 'frozen', False):
         base_path = sys._MEIPASS
-        predictor_path = os.path.join(base_path, 'assets', 'models', 'shape_predictor_68_face_landmarks.dat')
-    else:
-        app_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        predictor_path = os.path.join(app_root, 'electron', 'assets', 'models', 'shape_predictor_68_face_landmarks.dat')
+        return os.path.join(base_path, 'assets', 'models', filename)
+    app_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(app_root, 'electron', 'assets', 'models', filename)
+
+def get_predictor_path():
+    return get_model_path('shape_predictor_68_face_landmarks.dat')
+
+def enable_eye_classifier(enabled):
+    global EYE_CLASSIFIER_ENABLED, EYE_CLASSIFIER_REFRESH_INTERVAL, eye_classifier
+    
+    # A number enables the classifier with that predictor re-anchor interval
+    if enabled and not isinstance(enabled, bool) and isinstance(enabled, (int, float)):
+        if enabled < 2:
+            emit({"error": "Eye classifier re-anchor interval must be at least 2 frames"})
+            return False
+        EYE_CLASSIFIER_REFRESH_INTERVAL = int(enabled)
     
+    if enabled and eye_classifier is None:
+        model_path = get_model_path(EYE_CLASSIFIER_MODEL)
+        if not os.path.exists(model_path):
+            emit({"error": f"Eye openness model not found at: {model_path}"})
+            return False
+        eye_classifier = EyeOpennessClassifier.load(model_path)
+    
+    EYE_CLASSIFIER_ENABLED = bool(enabled)
+    return True
+
+def emit_memory_status(status):
+    emit({"status": status, "rss_mb": round(get_rss_bytes() / (1024 * 1024), 1)})
+
+def release_free_memory():
+    """Ask the C allocator to return freed pages to the OS where it has a call for that."""
+    import ctypes
+    try:
+        if sys.platform.startswith("linux"):
+            ctypes.CDLL("libc.so.6").malloc_trim(0)
+        elif sys.platform == "darwin":
+            ctypes.CDLL("/usr/lib/libSystem.dylib").malloc_zone_pressure_relief(None, 0)
+    except (OSError, AttributeError):
+        pass
+
+def _load_models_worker():
+    global face_detector, landmark_predictor
+    
+    start = time.perf_counter()
+    predictor_path = get_predictor_path()
     if not os.path.exists(predictor_path):
-        print(json.dumps({"error": f"Facial landmark model not found at: {predictor_path}"}))
-        sys.exit(1)
+        emit({"error": f"Facial landmark model not found at: {predictor_path}"})
+        return
     
-    predictor = dlib.shape_predictor(predictor_path)
-    buffers = PreallocatedBuffers()
+    try:
+        detector = dlib.get_frontal_face_detector()
+        predictor = dlib.shape_predictor(predictor_path)
+    except Exception as e:
+        # A truncated or corrupt file (e.g. a Git LFS pointer) fails here, not at the exists check
+        emit({"error": f"Failed to load facial landmark model from {predictor_path}: {str(e)}"})
+        return
+    with model_lock:
+        face_detector, landmark_predictor = detector, predictor
+    emit_memory_status(f"Models loaded in {time.perf_counter() - start:.2f}s")
+
+def load_models_async():
+    """Start loading the models in a background thread unless they are loaded or loading."""
+    global model_loader
     
-    print(json.dumps({"status": "Models loaded successfully, ready for camera activation"}))
-    print(json.dumps({"debug": "Advanced blink detection with dynamic baseline is active"}))
-    sys.stdout.flush()
+    with model_lock:
+        if landmark_predictor is not None or (model_loader is not None and model_loader.is_alive()):
+            return
+        model_loader = threading.Thread(target=_load_models_worker, name="model-loader", daemon=True)
+        model_loader.start()
+
+def wait_for_models():
+    """Return (detector, predictor), loading them first if needed; (None, None) if loading failed."""
+    load_models_async()
+    loader = model_loader
+    if loader is not None:
+        loader.join()
+    with model_lock:
+        return face_detector, landmark_predictor
+
+def unload_models():
+    global face_detector, landmark_predictor
     
-    last_blink_time = time.time()
-    frame_count = 0
-    last_face_detection_time = 0
-    cached_face_data = None
+    with model_lock:
+        if landmark_predictor is None:
+            return
+        face_detector = landmark_predictor = None
+    gc.collect()
+    release_free_memory()
+    emit_memory_status("Models unloaded")
+
+def load_models():
+    global face_detector, landmark_predictor
     
-    frame_interval = 1.0 / target_fps
-    last_frame_time = time.time()
+    predictor_path = get_predictor_path()
+    if not os.path.exists(predictor_path):
+        emit({"error": f"Facial landmark model not found at: {predictor_path}"})
+        output_writer.flush()
+        sys.exit(1)
+    
+    face_detector = dlib.get_frontal_face_detector()
+    landmark_predictor = dlib.shape_predictor(predictor_path)
+    return face_detector, landmark_predictor
+
+def resize_frame(frame, resolution):
+    if frame.shape[:2] != resolution[::-1]:
+        frame = cv2.resize(frame, resolution)
+    return frame
+
+def prepare_frame(frame, resolution=None):
+    frame = resize_frame(frame, resolution or processing_resolution)
+    gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return frame, gray
+
+def analyze_frame(frame, gray, detector, predictor, buffers, state, current_time, faces=None, tracker=None, shadows=None,
+                  quality=None):
+    """Detect faces, eye landmarks and blinks on one prepared frame.
+    
+    Passing faces skips the face detector and makes this a landmark-only frame.
+    Passing an EyeLandmarkTracker propagates a single face's eye landmarks by
+    optical flow instead of running the predictor, until it needs re-anchoring.
+    With the eye classifier enabled the tracker also holds the patch anchors,
+    and on frames without a predictor pass the EAR fed to the blink state
+    machine comes from the patch openness score.
+    Passing a ShadowEvaluator feeds it the same EAR samples as the primary state.
+    Passing a FrameQualityGate skips landmarking on faces that fail it; the
+    face is reported without landmarks and the blink state machine sees a gap.
+    Returns the faceData payload and the blink event message, or None when
+    no blink completed on this frame.
+    """
+    if faces is None:
+        faces = detector(gray, 0)
     
-    default_face_data = {
+    face_data = {
         "faceDetected": False,
         "ear": 0.0,
         "blink": False,
         "faceRect": {"x": 0, "y": 0, "width": 0, "height": 0},
         "eyeLandmarks": []
     }
+    blink_event = None
+    
+    if tracker is not None and len(faces) != 1:
+        tracker.reset()
+    
+    classifier = eye_classifier if EYE_CLASSIFIER_ENABLED else None
+    
+    for face in faces:
+        frame_width = frame.shape[1]
+        frame_height = frame.shape[0]
+        
+        face_data["faceDetected"] = True
+        face_data["faceRect"] = {
+            "x": float(face.left() / frame_width),
+            "y": float(face.top() / frame_height),
+            "width": float(face.width() / frame_width),
+            "height": float(face.height() / frame_height)
+        }
+        
+        if quality is not None:
+            reason = quality.check(gray, face)
+            if reason is not None:
+                if tracker is not None:
+                    tracker.reset()
+                # No interpolation across the gap; the next usable sample starts afresh
+                state.previous_time = None
+                face_data["ear"] = float(state.previous_ear or 0.0)
+                face_data["quality"] = reason
+                continue
+            face_data.pop("quality", None)
+            landmark_start = time.perf_counter()
+        
+        tracked = None
+        if tracker is not None and not tracker.needs_refresh():
+            tracked = tracker.track(gray) if LANDMARK_TRACKING_ENABLED else tracker.hold(gray)
+        
+        if tracked is not None:
+            left_eye, right_eye = tracked
+        else:
+            left_eye, right_eye = get_eye_landmarks_only(predictor, gray, face, buffers)
+            if tracker is not None:
+                tracker.anchor(gray, left_eye, right_eye)
+        
+        left_ear = calculate_ear_fast(left_eye, buffers)
+        right_ear = calculate_ear_fast(right_eye, buffers)
+        
+        if classifier is not None:
+            left_open = classifier.score(gray, left_eye)
+            right_open = classifier.score(gray, right_eye)
+            if left_open is not None and right_open is not None:
+                face_data["openness"] = (left_open + right_open) * 0.5
+                reference_ear = state.current_baseline_ear or (left_ear + right_ear) * 0.5
+                if tracked is not None:
+                    # Held landmarks carry no EAR information; flow-tracked ones are averaged in
+                    left_classified = openness_to_ear(left_open, reference_ear)
+                    right_classified = openness_to_ear(right_open, reference_ear)
+                    if LANDMARK_TRACKING_ENABLED:
+                        left_ear = (left_ear + left_classified) * 0.5
+                        right_ear = (right_ear + right_classified) * 0.5
+                    else:
+                        left_ear, right_ear = left_classified, right_classified
+        
+        ear_velocity = None
+        if EAR_FILTER_ENABLED:
+            avg_ear, ear_velocity = filter_ear(left_ear, right_ear, current_time, state)
+        else:
+            avg_ear = (left_ear + right_ear) * 0.5
+        
+        face_data["ear"] = float(avg_ear)
+        
+        buffers.concatenated_eyes[:6] = left_eye
+        buffers.concatenated_eyes[6:] = right_eye
+        
+        # A fresh list per frame: BlinkPipeline callers keep face_data past the next frame
+        face_data["eyeLandmarks"] = [{"x": float(x) / frame_width, "y": float(y) / frame_height}
+                                     for x, y in buffers.concatenated_eyes]
+        
+        blink_detected, blink_info = detect_blink_advanced(avg_ear, current_time, state, ear_velocity)
+        if quality is not None:
+            quality.record_landmarking(time.perf_counter() - landmark_start)
+        if shadows is not None:
+            shadows.update(avg_ear, current_time, ear_velocity, blink_info["onset"] if blink_detected else None)
+        
+        # Simplified blink state management to prevent visual flicker
+        if blink_detected and blink_info:
+            state.last_blink_display_time = current_time
+            face_data["blink"] = True
+            
+            # Use the EAR value at maximum drop for more accurate reporting
+            max_drop_ear = blink_info.get("max_drop_ear", avg_ear)
+            
+            blink_event = {
+                "blink": True,
+                "ear": float(max_drop_ear), 
+                "baseline": float(blink_info["baseline"]),
+                "drop_percentage": float(blink_info["drop"]),
+                "duration": float(blink_info["duration"]),
+                "onset": float(blink_info["onset"]),
+                "time": float(current_time)
+            }
+        elif (current_time - state.last_blink_display_time) < BLINK_DISPLAY_DURATION:
+            face_data["blink"] = True
+        
+        # Provide real-time feedback on detection status
+        current_baseline_ear = state.current_baseline_ear
+        if blink_info and current_baseline_ear > 0:
+            face_data["baseline"] = float(current_baseline_ear)
+            face_data["blink_phase"] = blink_info.get("phase", "monitoring")
+            
+            # Add debug info for threshold monitoring
+            if blink_info.get("phase") == "monitoring":
+                current_ear_drop_absolute = current_baseline_ear - avg_ear
+                if current_ear_drop_absolute > 0:
+                    face_data["ear_drop_absolute"] = float(current_ear_drop_absolute)
+                    face_data["ear_drop_percentage"] = float((current_baseline_ear - avg_ear) / current_baseline_ear)
+        elif current_baseline_ear == 0:
+            face_data["blink_phase"] = "initializing"
+    
+    return face_data, blink_event
+
+def emit_frame_result(face_data, blink_event, stream_id=None):
+    # Multi-stream output carries the stream id on every message
+    tag = {} if stream_id is None else {"stream": stream_id}
+    
+    if blink_event:
+        emit({**tag, **blink_event})
+        emit({**tag,
+            "debug": f"Blink detected! Max Drop EAR: {blink_event['ear']:.3f}, Baseline: {blink_event['baseline']:.3f}, Drop: {blink_event['drop_percentage']:.1%}, Duration: {blink_event['duration']:.3f}s, Absolute Drop: {blink_event['baseline'] - blink_event['ear']:.3f}"
+        })
     
-    input_handler = threading.Thread(target=input_thread, daemon=True)
-    input_handler.start()
+    if face_data.get("faceDetected", False) or tag:
+        emit({**tag, "faceData": face_data})
+    else:
+        emit(get_no_face_line())
+
+# Parallel full-frame face detection. Faces smaller than DETECTION_TILE_OVERLAP are found in
+# overlapping full-resolution tiles; larger ones in one pass over the frame shrunk by
+# DETECTION_LARGE_FACE_SCALE, which is four steps of dlib's 5/6 pyramid
+DETECTION_WORKERS = max(1, min(4, os.cpu_count() or 1))
+DETECTION_MIN_PIXELS = 640 * 480
+DETECTION_TILE_OVERLAP = 192
+DETECTION_LARGE_FACE_SCALE = (5 / 6) ** 4
+DETECTION_NMS_OVERLAP = 0.4
+
+def rect_overlap(a, b):
+    """Intersection over the smaller of the two (left, top, right, bottom) boxes."""
+    width = min(a[2], b[2]) - max(a[0], b[0])
+    height = min(a[3], b[3]) - max(a[1], b[1])
+    if width <= 0 or height <= 0:
+        return 0.0
+    smaller = min((a[2] - a[0]) * (a[3] - a[1]), (b[2] - b[0]) * (b[3] - b[1]))
+    return width * height / max(smaller, 1)
+
+def suppress_overlaps(boxes, scores, max_overlap=DETECTION_NMS_OVERLAP):
+    kept = []
+    for i in sorted(range(len(boxes)), key=lambda i: -scores[i]):
+        if all(rect_overlap(boxes[i], boxes[k]) <= max_overlap for k in kept):
+            kept.append(i)
+    return [boxes[i] for i in sorted(kept)]
+
+class TiledFaceDetector:
+    """Drop-in for a dlib face detector that splits full-frame scans across a thread pool.
+    
+    dlib releases the GIL while it scans, so the tiles run in parallel. Each
+    pool thread has its own detector. Frames below DETECTION_MIN_PIXELS, or
+    whose tiles would cover most of the frame anyway, get a single call.
+    Results are merged by non-max suppression and returned as dlib.rectangles.
+    With reacquire_only, a frame after one that had a face gets a single call
+    first, and the tiles only run when that call finds nothing.
+    """
+    def __init__(self, workers=None, detector=None, detector_factory=None, min_pixels=None, reacquire_only=False):
+        self.workers = max(1, workers or DETECTION_WORKERS)
+        self.detector_factory = detector_factory or dlib.get_frontal_face_detector
+        self.min_pixels = DETECTION_MIN_PIXELS if min_pixels is None else min_pixels
+        self.reacquire_only = reacquire_only
+        self.had_face = False
+        self.detector = detector or self.detector_factory()
+        self._local = threading.local()
+        self._executor = None
+        self._plans = {}
+
+    def _thread_detector(self):
+        detector = getattr(self._local, "detector", None)
+        if detector is None:
+            detector = self._local.detector = self.detector_factory()
+        return detector
+
+    def plan(self, width, height):
+        """Tile rectangles for a frame size, or None when one call is as fast."""
+        key = (width, height)
+        if key not in self._plans:
+            self._plans[key] = self._make_plan(width, height)
+        return self._plans[key]
+
+    def _make_plan(self, width, height):
+        if self.workers < 2 or width * height < self.min_pixels:
+            return None
+        
+        best = None
+        # One worker takes the shrunken pass; the rest share the tiles
+        tile_count = max(1, self.workers - 1)
+        for rows in range(1, tile_count + 1):
+            cols = tile_count // rows
+            tile_width = min(width, -(-width // cols) + DETECTION_TILE_OVERLAP)
+            tile_height = min(height, -(-height // rows) + DETECTION_TILE_OVERLAP)
+            if best is None or tile_width * tile_height < best[0]:
+                best = (tile_width * tile_height, rows, cols, tile_width, tile_height)
+        area, rows, cols, tile_width, tile_height = best
+        if area > 0.75 * width * height:
+            return None
+        
+        tiles = []
+        for row in range(rows):
+            for col in range(cols):
+                left = 0 if cols == 1 else round(col * (width - tile_width) / (cols - 1))
+                top = 0 if rows == 1 else round(row * (height - tile_height) / (rows - 1))
+                tiles.append((left, top, left + tile_width, top + tile_height))
+        return tiles
+
+    def _scan(self, image, upsample, offset=(0, 0), scale=1.0):
+        rects, scores, _ = self._thread_detector().run(image, upsample, 0.0)
+        boxes = [(rect.left() / scale + offset[0], rect.top() / scale + offset[1],
+                  rect.right() / scale + offset[0], rect.bottom() / scale + offset[1]) for rect in rects]
+        return boxes, list(scores)
+
+    def __call__(self, gray, upsample=0):
+        height, width = gray.shape[:2]
+        tiles = self.plan(width, height) if upsample == 0 else None
+        if tiles is None or (self.reacquire_only and self.had_face):
+            faces = self.detector(gray, upsample)
+            if tiles is None or len(faces) > 0:
+                self.had_face = len(faces) > 0
+                return faces
+        
+        faces = self._detect_tiles(gray, tiles)
+        self.had_face = len(faces) > 0
+        return faces
+
+    def _detect_tiles(self, gray, tiles):
+        height, width = gray.shape[:2]
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix="face-detect")
+        scale = DETECTION_LARGE_FACE_SCALE
+        small = cv2.resize(gray, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+        futures = [self._executor.submit(self._scan, small, 0, (0, 0), scale)]
+        for left, top, right, bottom in tiles:
+            # Slicing keeps a view; dlib needs contiguous rows
+            tile = np.ascontiguousarray(gray[top:bottom, left:right])
+            futures.append(self._executor.submit(self._scan, tile, 0, (left, top)))
+        
+        boxes, scores = [], []
+        for future in futures:
+            tile_boxes, tile_scores = future.result()
+            boxes += tile_boxes
+            scores += tile_scores
+        
+        faces = dlib.rectangles()
+        for left, top, right, bottom in suppress_overlaps(boxes, scores):
+            faces.append(dlib.rectangle(int(round(left)), int(round(top)), int(round(right)), int(round(bottom))))
+        return faces
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+FrameResult = namedtuple("FrameResult", ["face_detected", "ear", "rect", "landmarks", "blink", "face_data"])
+FrameResult.__doc__ = """Result of BlinkPipeline.process_frame.
+
+face_detected: whether a face was found
+ear: average eye aspect ratio fed to the blink state machine, 0.0 without a face
+rect: face rectangle (x, y, width, height) in pixels of the processed frame, or None
+landmarks: (12, 2) float32 array of eye landmarks in pixels, left eye first, or None
+    (also when the quality gate skipped the face; face_data["quality"] says why)
+blink: blink event dict (ear, baseline, drop_percentage, duration, onset, time)
+    when a blink completed on this frame, otherwise None
+face_data: the faceData payload the stdio protocol sends for this frame
+"""
+
+class BlinkPipeline:
+    """Blink detection on frames supplied by the caller, for use in-process.
+    
+    Models are loaded once per pipeline. Frames are BGR or grayscale uint8
+    NumPy arrays; a frame already at the processing resolution (or any frame
+    when resolution is None) is used as-is, never copied or modified. The
+    module-level switches (EAR_FILTER_ENABLED, LANDMARK_TRACKING_ENABLED,
+    EYE_CLASSIFIER_ENABLED) apply here as they do in the stdio detector.
+    A pipeline keeps per-stream state and is not thread-safe; use one per
+    stream or thread.
+    """
+    def __init__(self, resolution=None, predictor_path=None, detector=None, predictor=None,
+                 state=None, tracker=None):
+        if predictor is None:
+            predictor_path = predictor_path or get_predictor_path()
+            if not os.path.exists(predictor_path):
+                raise FileNotFoundError(f"Facial landmark model not found at: {predictor_path}")
+            predictor = dlib.shape_predictor(predictor_path)
+        self.detector = detector or dlib.get_frontal_face_detector()
+        self.predictor = predictor
+        self.resolution = resolution
+        self.state = state or BlinkState()
+        self.tracker = tracker or EyeLandmarkTracker()
+        self.buffers = PreallocatedBuffers()
+        self.last_faces = None
+        self.last_shape = None
+        self.frames_since_detection = 0
+        # Optional ShadowEvaluator run on this pipeline's EAR samples
+        self.shadows = None
+        # Optional FrameQualityGate checked before landmarking each face
+        self.quality = None
+
+    def reset(self):
+        """Forget the baseline, blink progress and tracked face, e.g. for a new video."""
+        self.state.reset()
+        if self.shadows is not None:
+            self.shadows.reset()
+        self.reset_tracking()
+
+    def close(self):
+        """Stop the detector's worker threads, if it has any."""
+        close = getattr(self.detector, "close", None)
+        if close is not None:
+            close()
+
+    def reset_tracking(self):
+        self.tracker.reset()
+        self.last_faces = None
+        self.last_shape = None
+        self.frames_since_detection = 0
+
+    def process_frame(self, frame, timestamp=None, face_detect_interval=1, resolution=None):
+        """Run one frame through detection and return a FrameResult.
+        
+        timestamp is in seconds and defaults to the current time.
+        face_detect_interval > 1 reuses the last face rectangle for that many
+        frames, running only the landmark predictor in between. resolution
+        overrides the pipeline's processing resolution for this frame.
+        """
+        current_time = time.time() if timestamp is None else timestamp
+        resolution = resolution or self.resolution
+        if resolution is not None:
+            frame, gray = prepare_frame(frame, resolution)
+        else:
+            gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        
+        tracker = self.tracker if LANDMARK_TRACKING_ENABLED or EYE_CLASSIFIER_ENABLED else None
+        if gray.shape != self.last_shape:
+            self.tracker.reset()
+        
+        # Landmark-only frames reuse the last face rectangle until the next detection is due,
+        # and while eye landmarks are tracked or held the face detector is skipped too
+        if (not self.last_faces or gray.shape != self.last_shape or
+                (self.frames_since_detection >= face_detect_interval - 1 and
+                 (tracker is None or tracker.needs_refresh()))):
+            faces = self.detector(gray, 0)
+            self.last_faces = faces
+            self.last_shape = gray.shape
+            self.frames_since_detection = 0
+        else:
+            faces = self.last_faces
+            self.frames_since_detection += 1
+        
+        face_data, blink_event = analyze_frame(frame, gray, self.detector, self.predictor, self.buffers,
+                                               self.state, current_time, faces, tracker, self.shadows, self.quality)
+        
+        if not face_data["faceDetected"]:
+            return FrameResult(False, 0.0, None, None, blink_event, face_data)
+        
+        height, width = gray.shape
+        face_rect = face_data["faceRect"]
+        rect = (face_rect["x"] * width, face_rect["y"] * height, face_rect["width"] * width, face_rect["height"] * height)
+        # A face skipped by the quality gate has no landmarks of its own
+        landmarks = None if "quality" in face_data else self.buffers.concatenated_eyes.copy()
+        return FrameResult(True, face_data["ear"], rect, landmarks, blink_event, face_data)
+
+    def process_batch(self, frames, timestamps=None, fps=TARGET_FPS):
+        """Process a sequence of frames (or an N x H x W [x 3] array) in order.
+        
+        Without timestamps, frame i is taken to be at i / fps seconds.
+        Returns a list of FrameResult.
+        """
+        if timestamps is None:
+            timestamps = [i / fps for i in range(len(frames))]
+        elif len(timestamps) != len(frames):
+            raise ValueError("timestamps must have one entry per frame")
+        return [self.process_frame(frame, float(t)) for frame, t in zip(frames, timestamps)]
+
+class CpuGovernor:
+    """Holds the detector's own CPU use under a budget by moving along GOVERNOR_LADDER.
+    
+    CPU use is process time over wall time across a GOVERNOR_WINDOW, as a
+    percentage of one core. The governor steps down a rung when over budget and
+    back up when under GOVERNOR_HEADROOM of it. It never steps while a blink is
+    in progress, and both the FPS and the resolution rung are lifted for the
+    duration of a blink, so the eyelids are sampled at full rate and full
+    detail. The face detection interval is kept: within a blink the head
+    barely moves, landmark-only frames reuse a rectangle that still fits, and
+    the resolution change itself makes the next frame run a fresh detection.
+    """
+    def __init__(self, budget_percent=None):
+        self.budget_percent = budget_percent
+        self.level = 0
+        self.cpu_percent = 0.0
+        self._reset_window()
+
+    def _reset_window(self):
+        self._window_wall = time.perf_counter()
+        self._window_cpu = time.process_time()
+
+    def set_budget(self, budget_percent):
+        self.budget_percent = budget_percent if budget_percent and budget_percent > 0 else None
+        if self.budget_percent is None:
+            self.level = 0
+        self._reset_window()
+        return self.report("budget_changed")
+
+    def settings(self, blink_in_progress=False):
+        face_detect_interval, resolution_scale, fps_scale = GOVERNOR_LADDER[self.level]
+        if blink_in_progress:
+            resolution_scale = fps_scale = 1.0
+        return face_detect_interval, resolution_scale, fps_scale
+
+    def update(self, blink_in_progress=False):
+        """Close the measurement window if due; return a report when the level changed."""
+        elapsed = time.perf_counter() - self._window_wall
+        if elapsed < GOVERNOR_WINDOW:
+            return None
+        
+        self.cpu_percent = 100.0 * (time.process_time() - self._window_cpu) / elapsed
+        self._reset_window()
+        
+        if self.budget_percent is None or blink_in_progress:
+            return None
+        
+        if self.cpu_percent > self.budget_percent and self.level < len(GOVERNOR_LADDER) - 1:
+            self.level += 1
+            return self.report("over_budget")
+        if self.cpu_percent < self.budget_percent * GOVERNOR_HEADROOM and self.level > 0:
+            self.level -= 1
+            return self.report("under_budget")
+        return None
+
+    def report(self, reason):
+        face_detect_interval, resolution_scale, fps_scale = self.settings()
+        return {
+            "level": self.level,
+            "max_level": len(GOVERNOR_LADDER) - 1,
+            "reason": reason,
+            "cpu_percent": round(self.cpu_percent, 1),
+            "budget_percent": self.budget_percent,
+            "face_detect_interval": face_detect_interval,
+            "resolution": list(scale_resolution(processing_resolution, resolution_scale)),
+            "fps": round(target_fps * fps_scale, 2),
+        }
+
+def scale_resolution(resolution, scale):
+    return (max(1, int(resolution[0] * scale)), max(1, int(resolution[1] * scale)))
+
+cpu_governor = CpuGovernor()
+landmark_tracker = EyeLandmarkTracker()
+
+class CaptureStream:
+    """One capture source in multi-stream mode, with its own isolated blink state."""
+    def __init__(self, stream_id, source, fps=None, capture=None):
+        self.stream_id = stream_id
+        self.source = source
+        self.interval = 1.0 / (fps or target_fps)
+        self.cap = capture
+        self.state = BlinkState()
+        self.tracker = EyeLandmarkTracker()
+        self.last_faces = None
+        self.active = True
+        self.read_failures = 0
+        self.frames_processed = 0
+
+    def open(self):
+        if self.cap is not None:
+            return True
+        
+        if isinstance(self.source, int):
+            for backend in get_camera_backends():
+                capture = cv2.VideoCapture(self.source, backend)
+                if capture.isOpened():
+                    self.cap = capture
+                    break
+                capture.release()
+        else:
+            capture = cv2.VideoCapture(self.source)
+            if capture.isOpened():
+                self.cap = capture
+            else:
+                capture.release()
+        return self.cap is not None
+
+    def at_end(self):
+        """True once a video file source has played its last frame."""
+        if isinstance(self.source, int) or self.cap is None:
+            return False
+        # Network streams report no frame count, so their failed reads stay errors
+        frame_count = self.cap.get(cv2.CAP_PROP_FRAME_COUNT)
+        return frame_count > 0 and self.cap.get(cv2.CAP_PROP_POS_FRAMES) >= frame_count
+
+    def release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+
+class StreamPool:
+    """Schedules N capture streams across a pool of worker threads.
+    
+    The ~100 MB landmark predictor is loaded once and shared by every worker.
+    Each worker builds its own HOG face detector (a few hundred KB) because dlib
+    object detectors must not be called concurrently. Streams sit in a heap
+    keyed by their next due time, so the most overdue stream is always served
+    first, and a stream is never processed by two workers at once.
+    """
+    def __init__(self, predictor, workers=STREAM_WORKERS, detector_factory=None):
+        self.predictor = predictor
+        self.worker_count = max(1, int(workers))
+        self.detector_factory = detector_factory or dlib.get_frontal_face_detector
+        self.streams = {}
+        self._heap = []
+        self._seq = 0
+        self._cond = threading.Condition()
+        self._threads = []
+        self._running = False
+
+    def start(self):
+        with self._cond:
+            if self._running:
+                return
+            self._running = True
+        for i in range(self.worker_count):
+            thread = threading.Thread(target=self._worker, name=f"stream-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self):
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        for stream in self.streams.values():
+            stream.release()
+        self.streams.clear()
+        self._heap.clear()
+
+    def add_stream(self, stream):
+        with self._cond:
+            if stream.stream_id in self.streams:
+                self.streams[stream.stream_id].active = False
+            self.streams[stream.stream_id] = stream
+            self._schedule(stream, time.time())
+
+    def remove_stream(self, stream_id):
+        with self._cond:
+            stream = self.streams.pop(stream_id, None)
+            if stream is not None:
+                # The worker that next pops it releases the capture
+                stream.active = False
+                self._cond.notify_all()
+        return stream is not None
+
+    def _schedule(self, stream, due):
+        self._seq += 1
+        heapq.heappush(self._heap, (due, self._seq, stream))
+        self._cond.notify()
+
+    def _next_stream(self):
+        with self._cond:
+            while self._running:
+                if self._heap:
+                    due, _, stream = self._heap[0]
+                    if not stream.active:
+                        heapq.heappop(self._heap)
+                        return stream, due
+                    wait = due - time.time()
+                    if wait <= 0:
+                        heapq.heappop(self._heap)
+                        return stream, due
+                    self._cond.wait(wait)
+                else:
+                    self._cond.wait()
+        return None, None
+
+    def _worker(self):
+        detector = self.detector_factory()
+        buffers = PreallocatedBuffers()
+        
+        while True:
+            stream, due = self._next_stream()
+            if stream is None:
+                return
+            if not stream.active:
+                stream.release()
+                continue
+            
+            next_due = self._process(stream, detector, buffers, due)
+            
+            with self._cond:
+                if next_due is None or not stream.active:
+                    stream.release()
+                    if self.streams.get(stream.stream_id) is stream:
+                        del self.streams[stream.stream_id]
+                elif self._running:
+                    self._schedule(stream, next_due)
+
+    def _process(self, stream, detector, buffers, due):
+        sid = stream.stream_id
+        try:
+            if not stream.open():
+                emit({"stream": sid, "error": f"Failed to open stream source: {stream.source}"})
+                return None
+            
+            ret, frame = stream.cap.read()
+            current_time = time.time()
+            if not ret or frame is None:
+                if stream.at_end():
+                    emit({"stream": sid, "status": "Stream ended"})
+                    return None
+                stream.read_failures += 1
+                if stream.read_failures == 1:
+                    emit({"stream": sid, "error": "Failed to read frame"})
+                if stream.read_failures >= STREAM_MAX_READ_FAILURES:
+                    emit({"stream": sid, "status": "Stream ended"})
+                    return None
+                return current_time + 0.1
+            stream.read_failures = 0
+            
+            frame, gray = prepare_frame(frame)
+            # While landmarks are tracked by flow or held for the classifier the face detector is skipped too
+            tracker = stream.tracker if LANDMARK_TRACKING_ENABLED or EYE_CLASSIFIER_ENABLED else None
+            if tracker is not None and stream.last_faces and not tracker.needs_refresh():
+                faces = stream.last_faces
+            else:
+                faces = detector(gray, 0)
+                stream.last_faces = faces
+            
+            face_data, blink_event = analyze_frame(frame, gray, detector, self.predictor, buffers, stream.state, current_time,
+                                                   faces, tracker)
+            emit_frame_result(face_data, blink_event, sid)
+            stream.frames_processed += 1
+        except Exception as e:
+            emit({"stream": sid, "error": f"Stream processing error: {str(e)}"})
+            return None
+        
+        # Never schedule into the past: a late stream waits its turn behind the others
+        return max(due + stream.interval, current_time)
+
+def start_streams(specs, workers=None):
+    global stream_pool
+    
+    _, predictor = wait_for_models()
+    if predictor is None:
+        emit({"error": "Models not loaded, cannot start streams"})
+        return False
+    
+    if stream_pool is None:
+        stream_pool = StreamPool(predictor, workers or STREAM_WORKERS)
+        stream_pool.start()
+        emit({"status": f"Stream pool started with {stream_pool.worker_count} workers"})
+    
+    for spec in specs:
+        stream_id = str(spec.get('id', spec.get('source')))
+        stream_pool.add_stream(CaptureStream(stream_id, spec.get('source', 0), spec.get('fps')))
+        emit({"stream": stream_id, "status": "Stream added"})
+    return True
+
+def stop_streams(stream_ids=None):
+    global stream_pool
+    
+    if stream_pool is None:
+        return
+    
+    if stream_ids is None:
+        stream_pool.stop()
+        stream_pool = None
+        emit({"status": "All streams stopped"})
+        return
+    
+    for stream_id in stream_ids:
+        if stream_pool.remove_stream(str(stream_id)):
+            emit({"stream": str(stream_id), "status": "Stream removed"})
+
+def set_camera_fps(fps):
+    """Ask the camera for fps; at a higher rate than the loop reads, cap.read() returns queued, stale frames."""
+    global camera_fps
+    cap.set(cv2.CAP_PROP_FPS, fps)
+    camera_fps = fps
+
+def create_camera_pipeline():
+    # Only the pipeline may hold the models, so dropping it lets them be unloaded
+    detector, predictor = wait_for_models()
+    if predictor is None:
+        return None
+    # Tiles only for re-acquisition; a tracked face is found again by one call
+    return BlinkPipeline(detector=TiledFaceDetector(detector=detector, reacquire_only=True), predictor=predictor,
+                         state=blink_state, tracker=landmark_tracker)
+
+def main(read_stdin=True):
+    global SEND_VIDEO, CAMERA_ACTIVE, cap
+    
+    # In stdio mode nobody is left to stop the camera once stdout breaks
+    output_writer.interrupt_main_on_close = read_stdin
+    # The daemon greets each client as it attaches; a banner here could reach
+    # a client that connected early and already got its own
+    if read_stdin:
+        emit({"status": "Starting blink detector in standby mode..."})
+    
+    # Models are loaded on the first start_camera, so standby costs little memory
+    pipeline = None
+    idle_since = time.time()
+    
+    if read_stdin:
+        emit_memory_status("Ready for camera activation")
+        emit({"debug": "Advanced blink detection with dynamic baseline is active"})
+    
+    frame_count = 0
+    last_frame_time = time.time()
+    reader = None
+    read_failures = 0
+    
+    if read_stdin:
+        input_handler = threading.Thread(target=input_thread, daemon=True)
+        input_handler.start()
     
     try:
         while True:
             process_commands()
             
+            if CAMERA_ACTIVE and camera_reconnect is not None:
+                if try_reconnect_camera():
+                    read_failures = 0
+                    if pipeline is not None:
+                        pipeline.reset_tracking()
+                time.sleep(0.01)
+                continue
+            
             if not CAMERA_ACTIVE or cap is None:
+                if idle_since is None:
+                    idle_since = time.time()
+                    read_failures = 0
+                    if pipeline is not None:
+                        pipeline.reset_tracking()
+                
+                if (landmark_predictor is not None and MODEL_IDLE_UNLOAD_SECONDS is not None and stream_pool is None and
+                        time.time() - idle_since >= MODEL_IDLE_UNLOAD_SECONDS):
+                    if pipeline is not None:
+                        pipeline.close()
+                        pipeline = None
+                    unload_models()
                 time.sleep(0.1)
                 continue
             
+            idle_since = None
+            if pipeline is None:
+                pipeline = create_camera_pipeline()
+                if pipeline is None:
+                    stop_camera()
+                    emit({"error": "Failed to start camera: models could not be loaded"})
+                    continue
+            
+            face_detect_interval, resolution_scale, fps_scale = cpu_governor.settings(blink_state.blink_in_progress)
+            if target_fps * fps_scale != camera_fps:
+                set_camera_fps(target_fps * fps_scale)
+            
             # Frame rate limiting for consistent processing
+            frame_interval = 1.0 / (target_fps * fps_scale)
             current_time = time.time()
             if current_time - last_frame_time < frame_interval:
                 time.sleep(0.001)
                 continue
             
+            frame_elapsed = min(current_time - last_frame_time, 1.0)
             last_frame_time = current_time
             
-            ret, frame = cap.read()
-            if not ret:
-                print(json.dumps({"error": "Failed to read frame"}))
-                time.sleep(0.1)
+            if reader is None or reader.abandoned:
+                if reader is not None:
+                    # Its thread exits once the stuck read returns
+                    reader.close()
+                reader = CaptureReader()
+            read = reader.read(cap)
+            if read is None:
+                camera_lost("read_timeout")
                 continue
             
-            current_shape = frame.shape[:2]
-            target_shape = processing_resolution[::-1]
-            if current_shape != target_shape:
-                frame = cv2.resize(frame, processing_resolution)
+            resolution = scale_resolution(processing_resolution, resolution_scale)
+            ret, frame = read
+            if ret and frame is not None and camera_raw_mjpeg:
+                # A corrupt JPEG counts as a failed read
+                frame = decode_mjpeg_frame(frame, resolution, SEND_VIDEO)
+            if not ret or frame is None:
+                read_failures += 1
+                if not camera_device_present():
+                    camera_lost("device_removed")
+                elif read_failures >= CAMERA_LOST_READ_FAILURES:
+                    camera_lost("read_failures")
+                continue
+            read_failures = 0
             
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            frame = resize_frame(frame, resolution)
+            pipeline.shadows = shadow_evaluator
+            pipeline.quality = quality_gate
+            result = pipeline.process_frame(frame, current_time, face_detect_interval)
+            face_data = result.face_data
+            emit_frame_result(face_data, result.blink)
             
-            faces = detector(gray, 0)
-            last_face_detection_time = current_time
+            if blink_log is not None:
+                if result.face_detected:
+                    blink_log.record_tracking(current_time, frame_elapsed)
+                if result.blink:
+                    blink_log.record_blink(result.blink)
             
-            face_data = default_face_data.copy()
+            governor_report = cpu_governor.update(blink_state.blink_in_progress)
+            if governor_report:
+                emit({"governor": governor_report})
             
-            for face in faces:
-                left_eye, right_eye = get_eye_landmarks_only(predictor, gray, face, buffers)
-                
-                left_ear = calculate_ear_fast(left_eye, buffers)
-                right_ear = calculate_ear_fast(right_eye, buffers)
-                avg_ear = (left_ear + right_ear) * 0.5
-                
-                frame_width = frame.shape[1]
-                frame_height = frame.shape[0]
-                
-                face_data["faceDetected"] = True
-                face_data["ear"] = float(avg_ear)
-                face_data["faceRect"] = {
-                    "x": float(face.left() / frame_width),
-                    "y": float(face.top() / frame_height),
-                    "width": float(face.width() / frame_width),
-                    "height": float(face.height() / frame_height)
-                }
-                
-                buffers.concatenated_eyes[:6] = left_eye
-                buffers.concatenated_eyes[6:] = right_eye
-                
-                for i in range(12):
-                    buffers.normalized_landmarks[i]["x"] = float(buffers.concatenated_eyes[i, 0] / frame_width)
-                    buffers.normalized_landmarks[i]["y"] = float(buffers.concatenated_eyes[i, 1] / frame_height)
-                
-                face_data["eyeLandmarks"] = buffers.normalized_landmarks.copy()
-                
-                blink_detected, blink_info = detect_blink_advanced(avg_ear, current_time)
-                
-                # Simplified blink state management to prevent visual flicker
-                if blink_detected and blink_info:
-                    last_blink_display_time = current_time
-                    face_data["blink"] = True
-                    
-                    # Use the EAR value at maximum drop for more accurate reporting
-                    max_drop_ear = blink_info.get("max_drop_ear", avg_ear)
-                    
-                    print(json.dumps({
-                        "blink": True,
-                        "ear": float(max_drop_ear), 
-                        "baseline": float(blink_info["baseline"]),
-                        "drop_percentage": float(blink_info["drop"]),
-                        "duration": float(blink_info["duration"]),
-                        "time": float(current_time)
-                    }))
-                    print(json.dumps({
-                        "debug": f"Blink detected! Max Drop EAR: {max_drop_ear:.3f}, Baseline: {blink_info['baseline']:.3f}, Drop: {blink_info['drop']:.1%}, Duration: {blink_info['duration']:.3f}s, Absolute Drop: {blink_info['baseline'] - max_drop_ear:.3f}"
-                    }))
-                    sys.stdout.flush()
-                elif (current_time - last_blink_display_time) < BLINK_DISPLAY_DURATION:
-                    face_data["blink"] = True
-                
-                # Provide real-time feedback on detection status
-                if blink_info and current_baseline_ear > 0:
-                    face_data["baseline"] = float(current_baseline_ear)
-                    face_data["blink_phase"] = blink_info.get("phase", "monitoring")
-                    
-                    # Add debug info for threshold monitoring
-                    if blink_info.get("phase") == "monitoring":
-                        current_ear_drop_absolute = current_baseline_ear - avg_ear
-                        if current_ear_drop_absolute > 0:
-                            face_data["ear_drop_absolute"] = float(current_ear_drop_absolute)
-                            face_data["ear_drop_percentage"] = float((current_baseline_ear - avg_ear) / current_baseline_ear)
-                elif current_baseline_ear == 0:
-                    face_data["blink_phase"] = "initializing"
-            
-            if face_data.get("faceDetected", False):
-                print(json.dumps({"faceData": face_data}))
-            else:
-                print(_cached_json_strings["no_face_data"])
-            sys.stdout.flush()
+            if shadow_evaluator is not None:
+                shadow_report = shadow_evaluator.report(current_time)
+                if shadow_report:
+                    emit({"shadow": shadow_report})
+            
+            if quality_gate is not None:
+                quality_report = quality_gate.report(current_time)
+                if quality_report:
+                    emit({"quality": quality_report})
             
             # Stream video for visualization when requested
             if SEND_VIDEO and face_data.get("faceDetected", False):
-                if processing_resolution == (640, 480):
+                if resolution == (640, 480):
                     frame_base64 = encode_frame(frame)
                 else:
                     display_frame = cv2.resize(frame, (640, 480))
                     frame_base64 = encode_frame(display_frame)
                 
-                print(json.dumps({"videoStream": frame_base64}))
-                sys.stdout.flush()
+                emit({"videoStream": frame_base64})
             
             frame_count += 1
             
     except KeyboardInterrupt:
-        print(json.dumps({"status": "Stopping blink detector..."}))
-        sys.stdout.flush()
+        emit({"status": "Stopping blink detector..."})
     finally:
+        if reader is not None:
+            reader.close()
+        stop_streams()
         stop_camera()
+        open_blink_log(None)
+        if pipeline is not None:
+            pipeline.close()
+
+class NullStream:
+    """Output target while no daemon client is attached."""
+    def write(self, text):
+        pass
+
+    def flush(self):
+        pass
+
+def default_socket_path():
+    runtime_dir = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    user = os.getuid() if hasattr(os, "getuid") else os.environ.get("USERNAME", "user")
+    return os.path.join(runtime_dir, f"screenblink-detector-{user}.sock")
+
+class DetectorDaemon:
+    """Serves the stdin/stdout command protocol over a Unix socket so models stay loaded between app runs.
+    
+    One client is attached at a time and the newest one wins: a new
+    connection detaches the previous client. Detaching stops the camera and
+    streams but keeps the models. A lock file next to the socket makes sure
+    only one daemon runs per socket path. With no client attached for
+    idle_shutdown seconds the daemon interrupts main() and exits.
+    """
+    def __init__(self, socket_path, idle_shutdown=DAEMON_IDLE_SHUTDOWN):
+        self.socket_path = socket_path
+        self.idle_shutdown = idle_shutdown
+        self.lock_file = None
+        self.server = None
+        self.client = None
+        self.client_lock = threading.Lock()
+        self.detached_since = time.time()
+        self.stopping = threading.Event()
+
+    def acquire(self):
+        """Take the single-instance lock; False if another daemon holds it."""
+        import fcntl
+        self.lock_file = open(self.socket_path + ".lock", "a")
+        try:
+            fcntl.flock(self.lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            self.lock_file.close()
+            self.lock_file = None
+            return False
+        return True
+
+    def listen(self):
+        # Holding the lock means a socket file left here belongs to a dead daemon
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        self.server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.server.bind(self.socket_path)
+        os.chmod(self.socket_path, 0o600)
+        self.server.listen(2)
+        self.server.settimeout(1.0)
+        threading.Thread(target=self._accept_loop, name="daemon-accept", daemon=True).start()
+
+    def _accept_loop(self):
+        while not self.stopping.is_set():
+            try:
+                conn, _ = self.server.accept()
+            except socket.timeout:
+                with self.client_lock:
+                    idle = self.client is None and time.time() - self.detached_since >= self.idle_shutdown
+                if idle:
+                    emit({"status": f"No client for {self.idle_shutdown:.0f} seconds, shutting down"})
+                    self.stopping.set()
+                    _thread.interrupt_main()
+                continue
+            except OSError:
+                break
+            self._attach(conn)
+
+    def _attach(self, conn):
+        conn.settimeout(None)
+        with self.client_lock:
+            previous = self.client
+            self.client = conn
+        if previous is not None:
+            # Stop whatever the previous client left running before this one's commands arrive
+            command_queue.put(json.dumps({"stop_streams": True}))
+            command_queue.put(json.dumps({"stop_camera": True}))
+            try:
+                previous.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+        
+        output_writer.set_stream(conn.makefile("w", encoding="utf-8", newline="\n"))
+        emit({"status": "Client attached", "models_loaded": landmark_predictor is not None})
+        emit_memory_status("Ready for camera activation")
+        threading.Thread(target=self._client_loop, args=(conn,), name="daemon-client", daemon=True).start()
+
+    def _client_loop(self, conn):
+        try:
+            for line in conn.makefile("r", encoding="utf-8"):
+                if line.strip():
+                    command_queue.put(line.strip())
+        except (OSError, ValueError):
+            pass
+        
+        with self.client_lock:
+            current = self.client is conn
+            if current:
+                self.client = None
+                self.detached_since = time.time()
+        conn.close()
+        if current:
+            output_writer.set_stream(NullStream())
+            command_queue.put(json.dumps({"stop_streams": True}))
+            command_queue.put(json.dumps({"stop_camera": True}))
+
+    def close(self):
+        self.stopping.set()
+        if self.server is not None:
+            self.server.close()
+            if os.path.exists(self.socket_path):
+                os.unlink(self.socket_path)
+        with self.client_lock:
+            if self.client is not None:
+                self.client.close()
+                self.client = None
+        if self.lock_file is not None:
+            self.lock_file.close()
+            self.lock_file = None
+
+def run_daemon(socket_path, idle_shutdown):
+    global MODEL_IDLE_UNLOAD_SECONDS
+    
+    if not hasattr(socket, "AF_UNIX"):
+        emit({"error": "Daemon mode needs Unix domain sockets, which this platform does not provide"})
+        return 1
+    
+    daemon = DetectorDaemon(socket_path, idle_shutdown)
+    if not daemon.acquire():
+        emit({"error": f"Another detector daemon is already serving {socket_path}"})
+        return 1
+    
+    output_writer.set_stream(NullStream())
+    # Warm models are the point of the daemon; they go away with the process instead
+    MODEL_IDLE_UNLOAD_SECONDS = None
+    load_models_async()
+    try:
+        daemon.listen()
+        main(read_stdin=False)
+    finally:
+        daemon.close()
+    return 0
 
 if __name__ == "__main__":
-    main() 
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="ScreenBlink blink detector")
+    parser.add_argument("--daemon", action="store_true", help="Serve the command protocol on a Unix socket instead of stdin/stdout")
+    parser.add_argument("--socket", default=None, help="Socket path for --daemon (default: in the user runtime directory)")
+    parser.add_argument("--idle-shutdown", type=float, default=DAEMON_IDLE_SHUTDOWN,
+                        help="Seconds without a client before the daemon exits")
+    args = parser.parse_args()
+    if args.daemon:
+        sys.exit(run_daemon(args.socket or default_socket_path(), args.idle_shutdown))
+    main()
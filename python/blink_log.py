@@ -0,0 +1,286 @@
+"""
+Durable blink event log with minute-level aggregates.
+
+A log is a directory holding:
+  events-YYYYMM.bin  blink events for one UTC month, fixed 24-byte records
+  minutes.bin        one 20-byte record per minute with tracking or blinks
+Every file starts with a 16-byte header (magic, version, record size) and
+keeps its records in time order, so the records are their own time index:
+a range is found by binary search on the memory-mapped file. A record cut
+short by a crash is trimmed when the file is opened. compact() deletes
+event months older than EVENT_RETENTION_DAYS and rewrites minutes.bin
+without records older than MINUTE_RETENTION_DAYS, merging duplicate
+minutes left by restarts.
+"""
+
+import calendar
+import glob
+import os
+import struct
+import threading
+import time
+
+import numpy as np
+
+EVENT_RETENTION_DAYS = 60
+MINUTE_RETENTION_DAYS = 730
+FORMAT_VERSION = 1
+
+HEADER = struct.Struct("<4sHH8x")
+EVENT_DTYPE = np.dtype([("time", "<f8"), ("ear", "<f4"), ("baseline", "<f4"),
+                        ("drop_percentage", "<f4"), ("duration", "<f4")])
+MINUTE_DTYPE = np.dtype([("minute", "<u4"), ("blinks", "<u4"), ("tracked_seconds", "<f4"),
+                         ("duration_sum", "<f4"), ("drop_sum", "<f4")])
+
+class RecordFile:
+    """Append-only file of fixed-size NumPy records behind a small header."""
+    def __init__(self, path, magic, dtype):
+        self.path = path
+        self.magic = magic
+        self.dtype = dtype
+        self.file = None
+        self._open()
+
+    def _open(self):
+        if not os.path.exists(self.path) or os.path.getsize(self.path) < HEADER.size:
+            with open(self.path, "wb") as f:
+                f.write(HEADER.pack(self.magic, FORMAT_VERSION, self.dtype.itemsize))
+        self.file = open(self.path, "r+b")
+        magic, version, record_size = HEADER.unpack(self.file.read(HEADER.size))
+        if magic != self.magic or version != FORMAT_VERSION or record_size != self.dtype.itemsize:
+            self.file.close()
+            raise ValueError(f"{self.path} is not a version {FORMAT_VERSION} {self.magic.decode()} file")
+
+        # Drop a partial record left by a crash mid-append
+        size = os.path.getsize(self.path)
+        whole = HEADER.size + (size - HEADER.size) // self.dtype.itemsize * self.dtype.itemsize
+        if whole != size:
+            self.file.truncate(whole)
+        self.file.seek(0, os.SEEK_END)
+
+    def __len__(self):
+        return (os.path.getsize(self.path) - HEADER.size) // self.dtype.itemsize
+
+    def append(self, records):
+        self.file.write(np.asarray(records, dtype=self.dtype).tobytes())
+        self.file.flush()
+
+    def records(self):
+        """Memory-mapped read-only view of all records."""
+        count = len(self)
+        if count == 0:
+            return np.empty(0, dtype=self.dtype)
+        return np.memmap(self.path, dtype=self.dtype, mode="r", offset=HEADER.size, shape=(count,))
+
+    def rewrite(self, records):
+        """Atomically replace the contents with records."""
+        records = np.array(records, dtype=self.dtype)
+        self.file.close()
+        temp_path = self.path + ".tmp"
+        with open(temp_path, "wb") as f:
+            f.write(HEADER.pack(self.magic, FORMAT_VERSION, self.dtype.itemsize))
+            f.write(records.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+        self._open()
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        if self.file is not None and not self.file.closed:
+            self.sync()
+            self.file.close()
+
+def read_records(path, magic, dtype):
+    """Memory-map a record file read-only, for months that are no longer written.
+
+    Unlike RecordFile this never creates, trims or rewrites the file; a
+    partial record at the end is simply left out of the view.
+    """
+    with open(path, "rb") as f:
+        header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return np.empty(0, dtype=dtype)
+    file_magic, version, record_size = HEADER.unpack(header)
+    if file_magic != magic or version != FORMAT_VERSION or record_size != dtype.itemsize:
+        raise ValueError(f"{path} is not a version {FORMAT_VERSION} {magic.decode()} file")
+    count = (os.path.getsize(path) - HEADER.size) // dtype.itemsize
+    if count == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode="r", offset=HEADER.size, shape=(count,))
+
+def month_key(timestamp):
+    t = time.gmtime(timestamp)
+    return t.tm_year * 100 + t.tm_mon
+
+def month_end(key):
+    year, month = divmod(key, 100)
+    year, month = (year + 1, 1) if month == 12 else (year, month + 1)
+    return calendar.timegm((year, month, 1, 0, 0, 0))
+
+class BlinkLog:
+    """Appends blink events and per-minute aggregates to a log directory and answers range queries.
+
+    Thread-safe. Times are Unix seconds. The aggregate for the current minute
+    is kept in memory until the minute ends or the log is closed, and is
+    included in query results.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self.lock = threading.Lock()
+        self.minutes = RecordFile(os.path.join(directory, "minutes.bin"), b"SBMN", MINUTE_DTYPE)
+        self.events = None
+        self.events_month = None
+        self.last_event_time = 0.0
+        self.current = None
+        self.compact()
+
+    def _event_path(self, key):
+        return os.path.join(self.directory, f"events-{key}.bin")
+
+    def _event_months(self):
+        keys = []
+        for path in glob.glob(os.path.join(self.directory, "events-*.bin")):
+            name = os.path.basename(path)[len("events-"):-len(".bin")]
+            if name.isdigit():
+                keys.append(int(name))
+        return sorted(keys)
+
+    def _minute_slot(self, timestamp):
+        minute = int(timestamp // 60)
+        if self.current is not None and minute > self.current["minute"]:
+            self._write_minute()
+        if self.current is None:
+            self.current = np.zeros((), dtype=MINUTE_DTYPE)
+            self.current["minute"] = minute
+        # A clock stepping backwards is counted in the minute already open
+        return self.current
+
+    def _write_minute(self):
+        if self.current["blinks"] or self.current["tracked_seconds"]:
+            self.minutes.append(self.current.reshape(1))
+        self.current = None
+
+    def record_blink(self, event):
+        """Append one blink event message (time, ear, baseline, drop_percentage, duration)."""
+        with self.lock:
+            # Keep the event files sorted even if the wall clock steps back
+            timestamp = max(float(event["time"]), self.last_event_time)
+            self.last_event_time = timestamp
+
+            key = month_key(timestamp)
+            if key != self.events_month:
+                if self.events is not None:
+                    self.events.close()
+                self.events = RecordFile(self._event_path(key), b"SBEV", EVENT_DTYPE)
+                if self.events_month is not None:
+                    self._compact_locked(timestamp)
+                self.events_month = key
+
+            record = np.zeros(1, dtype=EVENT_DTYPE)
+            record["time"] = timestamp
+            record["ear"] = event["ear"]
+            record["baseline"] = event["baseline"]
+            record["drop_percentage"] = event["drop_percentage"]
+            record["duration"] = event["duration"]
+            self.events.append(record)
+
+            slot = self._minute_slot(timestamp)
+            slot["blinks"] += 1
+            slot["duration_sum"] += event["duration"]
+            slot["drop_sum"] += event["drop_percentage"]
+
+    def record_tracking(self, timestamp, seconds):
+        """Add seconds during which a face was tracked, ending at timestamp."""
+        with self.lock:
+            slot = self._minute_slot(timestamp)
+            slot["tracked_seconds"] = min(60.0, slot["tracked_seconds"] + seconds)
+
+    def query_minutes(self, start, end, bucket=60):
+        """Blink counts and tracked seconds per bucket of whole minutes over [start, end)."""
+        bucket_minutes = max(1, int(bucket // 60))
+        first = int(start // 60)
+        last = int(-(-end // 60))
+        buckets = max(0, -(-(last - first) // bucket_minutes))
+
+        with self.lock:
+            records = self.minutes.records()
+            lo, hi = np.searchsorted(records["minute"], [first, last], side="left")
+            selected = np.array(records[lo:hi])
+            if self.current is not None and first <= self.current["minute"] < last:
+                selected = np.append(selected, self.current.reshape(1))
+
+        index = (selected["minute"].astype(np.int64) - first) // bucket_minutes
+        blinks = np.bincount(index, weights=selected["blinks"], minlength=buckets)
+        tracked = np.bincount(index, weights=selected["tracked_seconds"], minlength=buckets)
+        total_blinks = float(selected["blinks"].sum())
+        return {
+            "start": first * 60,
+            "bucket": bucket_minutes * 60,
+            "blinks": blinks.astype(int).tolist(),
+            "tracked_seconds": np.round(tracked, 1).tolist(),
+            "total_blinks": int(total_blinks),
+            "mean_duration": float(selected["duration_sum"].sum() / total_blinks) if total_blinks else 0.0,
+        }
+
+    def query_events(self, start, end, limit=10000):
+        """Individual blink events with start <= time < end, oldest first."""
+        results = []
+        with self.lock:
+            if self.events is not None:
+                self.events.file.flush()
+            for key in self._event_months():
+                if month_end(key) <= start or calendar.timegm((key // 100, key % 100, 1, 0, 0, 0)) >= end:
+                    continue
+                if key == self.events_month:
+                    records = self.events.records()
+                else:
+                    records = read_records(self._event_path(key), b"SBEV", EVENT_DTYPE)
+                lo, hi = np.searchsorted(records["time"], [start, end], side="left")
+                results.extend(records[lo:min(hi, lo + limit - len(results))].tolist())
+                if len(results) >= limit:
+                    break
+        return [dict(zip(EVENT_DTYPE.names, (float(v) for v in record))) for record in results]
+
+    def compact(self, now=None):
+        with self.lock:
+            self._compact_locked(now)
+
+    def _compact_locked(self, now=None):
+        now = time.time() if now is None else now
+        for key in self._event_months():
+            if key != self.events_month and month_end(key) < now - EVENT_RETENTION_DAYS * 86400:
+                os.remove(self._event_path(key))
+
+        records = self.minutes.records()
+        if len(records) == 0:
+            return
+        cutoff = int((now - MINUTE_RETENTION_DAYS * 86400) // 60)
+        minutes = records["minute"]
+        if minutes[0] >= cutoff and np.all(minutes[1:] > minutes[:-1]):
+            return
+
+        # Drop expired minutes and merge the duplicates restarts leave behind
+        records = np.array(records[np.searchsorted(minutes, cutoff):])
+        unique, index = np.unique(records["minute"], return_inverse=True)
+        merged = np.zeros(len(unique), dtype=MINUTE_DTYPE)
+        merged["minute"] = unique
+        merged["blinks"] = np.bincount(index, weights=records["blinks"], minlength=len(unique))
+        merged["tracked_seconds"] = np.minimum(60.0, np.bincount(index, weights=records["tracked_seconds"], minlength=len(unique)))
+        merged["duration_sum"] = np.bincount(index, weights=records["duration_sum"], minlength=len(unique))
+        merged["drop_sum"] = np.bincount(index, weights=records["drop_sum"], minlength=len(unique))
+        del minutes, records
+        self.minutes.rewrite(merged)
+
+    def close(self):
+        with self.lock:
+            if self.current is not None:
+                self._write_minute()
+            self.minutes.close()
+            if self.events is not None:
+                self.events.close()
+                self.events = None
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Replay EAR traces through the blink state machine and score recall/precision.
+
+A trace is a CSV with columns time,left_ear,right_ear,blink where blink is 1
+on samples taken while the eyes were closing or closed. Without --trace,
+synthetic traces with known blinks are generated. Each trace is replayed at
+its own rate and decimated to lower rates, with and without the EAR filter,
+and with the windowed or the quantile baseline. "quick" is the recall on
+blinks that follow the previous one within QUICK_BLINK_GAP seconds, where a
+baseline dragged down by the earlier blink would miss them.
+"""
+
+import argparse
+import csv
+import random
+
+import blink_detector
+
+MATCH_TOLERANCE = 0.4
+QUICK_BLINK_GAP = 2.0
+
+def load_trace(path):
+    samples = []
+    with open(path, newline='') as f:
+        for row in csv.DictReader(f):
+            samples.append((float(row['time']), float(row['left_ear']), float(row['right_ear']), int(row.get('blink', 0) or 0)))
+    return samples
+
+def synthetic_trace(duration=300.0, rate=30.0, seed=0):
+    """Open-eye EAR with landmark jitter, occasional landmark jumps and slow drift, plus 150-400 ms blinks."""
+    rng = random.Random(seed)
+    baseline = rng.uniform(0.24, 0.32)
+    blinks = []
+    t = rng.uniform(1.0, 4.0)
+    while t < duration - 2.0:
+        blinks.append((t, rng.uniform(0.15, 0.4), rng.uniform(0.55, 0.9)))
+        t += rng.uniform(1.5, 6.0)
+
+    samples = []
+    blink_index = 0
+    for i in range(int(duration * rate)):
+        t = i / rate + rng.uniform(-0.005, 0.005)
+        drift = 0.015 * ((i / rate) % 60.0) / 60.0
+        closure = 0.0
+        while blink_index < len(blinks) and blinks[blink_index][0] + blinks[blink_index][1] < t:
+            blink_index += 1
+        if blink_index < len(blinks):
+            start, length, depth = blinks[blink_index]
+            if start <= t <= start + length:
+                # Fast close, slower reopen
+                phase = (t - start) / length
+                closure = depth * (phase / 0.35 if phase < 0.35 else (1.0 - phase) / 0.65)
+        ear = (baseline - drift) * (1.0 - closure)
+        # Head motion occasionally throws the landmarks of both eyes for one frame
+        jump = -rng.uniform(0.04, 0.08) if rng.random() < 0.02 else 0.0
+        samples.append((t, ear + jump + rng.gauss(0, 0.012), ear + jump + rng.gauss(0, 0.012), int(closure > 0.3)))
+    return samples
+
+def blink_times(samples):
+    times = []
+    in_blink = False
+    for t, _, _, label in samples:
+        if label and not in_blink:
+            times.append(t)
+        in_blink = bool(label)
+    return times
+
+def replay(samples, use_filter, decimate=1, quantile_baseline=False):
+    state = blink_detector.BlinkState(blink_detector.BlinkConfig(baseline_quantile=quantile_baseline))
+    detected = []
+    for t, left_ear, right_ear, _ in samples[::decimate]:
+        ear_velocity = None
+        if use_filter:
+            ear, ear_velocity = blink_detector.filter_ear(left_ear, right_ear, t, state)
+        else:
+            ear = (left_ear + right_ear) * 0.5
+        blink, info = blink_detector.detect_blink_advanced(ear, t, state, ear_velocity)
+        if blink:
+            detected.append(info.get("onset", t - info["duration"]))
+    return detected
+
+def score(truth, detected):
+    unmatched = list(detected)
+    hits = 0
+    quick = quick_hits = 0
+    for i, t in enumerate(truth):
+        match = next((d for d in unmatched if abs(d - t) <= MATCH_TOLERANCE), None)
+        if match is not None:
+            unmatched.remove(match)
+            hits += 1
+        if i > 0 and t - truth[i - 1] <= QUICK_BLINK_GAP:
+            quick += 1
+            quick_hits += match is not None
+    recall = hits / len(truth) if truth else 1.0
+    precision = hits / len(detected) if detected else 1.0
+    quick_recall = quick_hits / quick if quick else 1.0
+    return recall, precision, quick_recall
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--trace", action="append", help="CSV trace file (repeatable)")
+    parser.add_argument("--synthetic", type=int, default=5, help="Synthetic traces when no --trace is given")
+    parser.add_argument("--rate", type=float, default=30.0, help="Sample rate of the synthetic traces")
+    args = parser.parse_args()
+
+    if args.trace:
+        traces = [load_trace(path) for path in args.trace]
+    else:
+        traces = [synthetic_trace(rate=args.rate, seed=seed) for seed in range(args.synthetic)]
+
+    span = traces[0][-1][0] - traces[0][0][0]
+    source_rate = (len(traces[0]) - 1) / span if span > 0 else args.rate
+    print(f"{len(traces)} traces, {sum(len(blink_times(t)) for t in traces)} labelled blinks, ~{source_rate:.0f} Hz")
+    print(f"{'mode':>10} {'baseline':>9} {'rate Hz':>8} {'recall':>8} {'precision':>10} {'quick':>8}")
+
+    for decimate in (1, 2, 3, 6):
+        for use_filter in (False, True):
+            for quantile_baseline in (False, True):
+                scores = [score(blink_times(samples), replay(samples, use_filter, decimate, quantile_baseline))
+                          for samples in traces]
+                recall, precision, quick = (sum(column) / len(scores) for column in zip(*scores))
+                mode = "filtered" if use_filter else "raw"
+                baseline = "quantile" if quantile_baseline else "window"
+                print(f"{mode:>10} {baseline:>9} {source_rate / decimate:>8.1f} {recall:>8.1%} {precision:>10.1%} {quick:>8.1%}")
+
+if __name__ == "__main__":
+    main()
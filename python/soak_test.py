@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Soak test for the detector process: many camera start/stop cycles under an accelerated clock.
+
+Runs the real main() loop with commands arriving over a stdin pipe, a fake
+capture source in place of the camera and a clock where sleeps return at once
+and wall time runs --speed times faster, so hours of use pass in minutes.
+Each cycle starts the camera, processes frames while changing resolution,
+frame rate and video preview, then stops the camera; every --unload-every
+cycles the models are also unloaded and reloaded. RSS, open file
+descriptors, thread count, live capture handles and frame latency are
+sampled along the way, printed as a trend report and checked against bounds.
+Everything is measured against the first sample after --warmup-frames frames,
+whose latencies are left out, so one-time costs (lazy imports, first
+allocations) are not mistaken for growth and drift cannot hide behind them.
+Exits with status 1 if any bound is exceeded.
+"""
+
+import argparse
+import _thread
+import csv
+import json
+import os
+import sys
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import blink_detector
+
+RESOLUTIONS = [(320, 240), (640, 480), (480, 360), (320, 240)]
+FPS_VALUES = [10, 15, 30, 5]
+
+class AcceleratedClock:
+    """Stand-in for the time module inside blink_detector."""
+    def __init__(self, speed):
+        self.speed = speed
+        self.real_start = time.perf_counter()
+        self.start = time.time()
+        self.skipped = 0.0
+        self.lock = threading.Lock()
+
+    def time(self):
+        return self.start + (time.perf_counter() - self.real_start) * self.speed + self.skipped
+
+    def sleep(self, seconds):
+        with self.lock:
+            self.skipped += seconds
+        # Still let other threads run
+        time.sleep(0)
+
+    def __getattr__(self, name):
+        return getattr(time, name)
+
+class FakeCapture:
+    """cv2.VideoCapture stand-in that counts open handles and stamps each frame read."""
+    open_handles = 0
+    frames = None
+
+    def __init__(self, *args):
+        FakeCapture.open_handles += 1
+        self.released = False
+        self.index = 0
+        self.width, self.height = 640, 480
+
+    def isOpened(self):
+        return not self.released
+
+    def read(self):
+        frame = self.frames[self.index % len(self.frames)]
+        self.index += 1
+        if frame.shape[1] != self.width:
+            frame = cv2.resize(frame, (self.width, self.height))
+        else:
+            # A real capture hands back a new buffer every frame
+            frame = frame.copy()
+        Monitor.read_time = time.perf_counter()
+        return True, frame
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_FRAME_WIDTH:
+            self.width = int(value)
+        elif prop == cv2.CAP_PROP_FRAME_HEIGHT:
+            self.height = int(value)
+        return True
+
+    def get(self, prop):
+        return {cv2.CAP_PROP_FRAME_WIDTH: self.width, cv2.CAP_PROP_FRAME_HEIGHT: self.height}.get(prop, 0)
+
+    def release(self):
+        if not self.released:
+            self.released = True
+            FakeCapture.open_handles -= 1
+
+class LineSink:
+    """Replaces stdout for the detector's output writer; counts lines and errors."""
+    def __init__(self):
+        self.lines = 0
+        self.errors = []
+
+    def write(self, text):
+        for line in text.splitlines():
+            self.lines += 1
+            if '"error"' in line:
+                self.errors.append(line)
+
+    def flush(self):
+        pass
+
+class Monitor:
+    """Counts processed frames and their read-to-output latency after the warm-up."""
+    read_time = None
+    frames = 0
+    warmup_frames = 0
+    latencies = []
+
+    @classmethod
+    def wrap(cls, emit_frame_result):
+        def wrapped(face_data, blink_event, stream_id=None):
+            if stream_id is None and cls.read_time is not None:
+                if cls.frames >= cls.warmup_frames:
+                    cls.latencies.append(time.perf_counter() - cls.read_time)
+                cls.read_time = None
+                cls.frames += 1
+            return emit_frame_result(face_data, blink_event, stream_id)
+        return wrapped
+
+def count_open_fds():
+    for path in ("/proc/self/fd", "/dev/fd"):
+        if os.path.isdir(path):
+            return len(os.listdir(path))
+    return -1
+
+def load_frames(video_path):
+    if video_path is None:
+        frame = np.full((480, 640, 3), 110, dtype=np.uint8)
+        cv2.circle(frame, (320, 220), 110, (190, 190, 190), -1)
+        return [frame]
+    capture = cv2.VideoCapture(video_path)
+    frames = []
+    while len(frames) < 300:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        frames.append(frame)
+    capture.release()
+    if not frames:
+        print(f"ERROR: No frames could be read from {video_path}")
+        sys.exit(1)
+    return frames
+
+def wait_for(condition, timeout=30.0):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            return False
+        time.sleep(0.002)
+    return True
+
+def sample(cycle, clock):
+    latencies = Monitor.latencies
+    Monitor.latencies = []
+    return {
+        "cycle": cycle,
+        "simulated_hours": (clock.time() - clock.start) / 3600.0,
+        "rss_mb": blink_detector.get_rss_bytes() / (1024 * 1024),
+        "fds": count_open_fds(),
+        "threads": threading.active_count(),
+        "captures": FakeCapture.open_handles,
+        "frames": Monitor.frames,
+        "latency_ms": 1000.0 * float(np.mean(latencies)) if latencies else 0.0,
+        "latency_p95_ms": 1000.0 * float(np.percentile(latencies, 95)) if latencies else 0.0,
+    }
+
+def drive(command_pipe, args, clock, samples, failures):
+    def send(command):
+        command_pipe.write(json.dumps(command) + "\n")
+        command_pipe.flush()
+
+    try:
+        for cycle in range(args.cycles):
+            send({"start_camera": True})
+            # Models load on the first start and again after every unload
+            if not wait_for(lambda: blink_detector.CAMERA_ACTIVE, 120.0):
+                failures.append(f"cycle {cycle}: camera did not start")
+                return
+
+            send({"processing_resolution": list(RESOLUTIONS[cycle % len(RESOLUTIONS)])})
+            send({"target_fps": FPS_VALUES[cycle % len(FPS_VALUES)]})
+            if cycle % 3 == 0:
+                send({"request_video": True})
+
+            target = Monitor.frames + args.frames_per_cycle
+            if not wait_for(lambda: Monitor.frames >= target):
+                failures.append(f"cycle {cycle}: frames stalled at {Monitor.frames}")
+                return
+
+            send({"stop_camera": True})
+            if not wait_for(lambda: not blink_detector.CAMERA_ACTIVE):
+                failures.append(f"cycle {cycle}: camera did not stop")
+                return
+
+            if args.unload_every and cycle % args.unload_every == args.unload_every - 1:
+                send({"model_idle_unload": 0.001})
+                if not wait_for(lambda: blink_detector.landmark_predictor is None):
+                    failures.append(f"cycle {cycle}: models were not unloaded")
+                    return
+                send({"model_idle_unload": 0})
+
+            if cycle % args.sample_every == 0 or cycle == args.cycles - 1:
+                # Let the output writer and command queue settle before measuring
+                blink_detector.output_writer.flush()
+                samples.append(sample(cycle, clock))
+                if not args.quiet:
+                    s = samples[-1]
+                    print(f"cycle {cycle:>6}: {s['rss_mb']:.1f} MB, {s['fds']} fds, {s['threads']} threads, "
+                          f"latency {s['latency_ms']:.2f} ms", file=sys.__stdout__, flush=True)
+    finally:
+        _thread.interrupt_main()
+
+def slope_per_1000(samples, key):
+    if len(samples) < 2:
+        return 0.0
+    cycles = np.array([s["cycle"] for s in samples], dtype=np.float64)
+    values = np.array([s[key] for s in samples], dtype=np.float64)
+    return float(np.polyfit(cycles, values, 1)[0] * 1000.0)
+
+def steady_samples(samples, warmup_frames):
+    # Samples taken during the warm-up still include one-time allocations
+    steady = [s for s in samples if s["frames"] >= warmup_frames]
+    return steady or samples[-1:]
+
+def check_bounds(samples, args):
+    failures = []
+    samples = steady_samples(samples, args.warmup_frames)
+    reference = samples[0]
+    last = samples[-1]
+
+    rss_growth = max(s["rss_mb"] for s in samples) - reference["rss_mb"]
+    if rss_growth > args.max_rss_growth:
+        failures.append(f"RSS grew {rss_growth:.1f} MB (limit {args.max_rss_growth} MB)")
+    if last["fds"] > reference["fds"] + args.max_fd_growth:
+        failures.append(f"open file descriptors went from {reference['fds']} to {last['fds']}")
+    if max(s["threads"] for s in samples) > reference["threads"] + args.max_thread_growth:
+        failures.append(f"thread count reached {max(s['threads'] for s in samples)} (started at {reference['threads']})")
+    if last["captures"] != 0:
+        failures.append(f"{last['captures']} capture handles still open after stop_camera")
+
+    # The baseline is the first sample after the warm-up; the end is the median of the last quarter
+    timed = [s for s in samples if s["latency_ms"] > 0]
+    if len(timed) >= 2:
+        late = timed[-max(1, (len(timed) - 1) // 4):]
+        for key, label in (("latency_ms", "frame latency"), ("latency_p95_ms", "p95 frame latency")):
+            baseline = timed[0][key]
+            end = float(np.median([s[key] for s in late]))
+            if end > baseline * args.max_latency_drift:
+                failures.append(f"{label} drifted from {baseline:.2f} ms to {end:.2f} ms")
+    return failures
+
+def write_report(samples, path):
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=list(samples[0].keys()))
+        writer.writeheader()
+        writer.writerows(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--cycles", type=int, default=2000, help="Camera start/stop cycles")
+    parser.add_argument("--frames-per-cycle", type=int, default=20)
+    parser.add_argument("--speed", type=float, default=60.0, help="Simulated seconds per real second")
+    parser.add_argument("--video", help="Video of a face to use as camera frames (default: synthetic frame)")
+    parser.add_argument("--unload-every", type=int, default=50, help="Cycles between model unloads (0: never)")
+    parser.add_argument("--sample-every", type=int, default=100, help="Cycles between samples")
+    parser.add_argument("--report", help="Write the samples to this CSV file")
+    parser.add_argument("--max-rss-growth", type=float, default=25.0, help="MB")
+    parser.add_argument("--max-fd-growth", type=int, default=2)
+    parser.add_argument("--max-thread-growth", type=int, default=1)
+    parser.add_argument("--warmup-frames", type=int, default=200,
+                        help="Frames before the baseline sample; their latencies are not counted")
+    parser.add_argument("--max-latency-drift", type=float, default=1.5,
+                        help="Late latency (median of the last quarter) over the baseline, for mean and p95")
+    parser.add_argument("--quiet", action="store_true")
+    args = parser.parse_args()
+
+    FakeCapture.frames = load_frames(args.video)
+    Monitor.warmup_frames = args.warmup_frames
+    clock = AcceleratedClock(args.speed)
+    blink_detector.time = clock
+    blink_detector.cv2.VideoCapture = FakeCapture
+    blink_detector.emit_frame_result = Monitor.wrap(blink_detector.emit_frame_result)
+    sink = LineSink()
+    blink_detector.output_writer.stream = sink
+
+    read_fd, write_fd = os.pipe()
+    sys.stdin = os.fdopen(read_fd)
+    # closefd=False: EOF on stdin would shut the detector down while the interpreter exits
+    command_pipe = os.fdopen(write_fd, "w", closefd=False)
+
+    samples = []
+    failures = []
+    driver = threading.Thread(target=drive, args=(command_pipe, args, clock, samples, failures), daemon=True)
+    start = time.perf_counter()
+    driver.start()
+    blink_detector.main()
+    driver.join()
+    elapsed = time.perf_counter() - start
+
+    if not samples:
+        print(f"ERROR: No samples collected: {'; '.join(failures)}")
+        sys.exit(1)
+    failures += check_bounds(samples, args)
+    failures += [f"detector error: {line}" for line in sink.errors[:5]]
+
+    steady = steady_samples(samples, args.warmup_frames)
+    first, last = steady[0], samples[-1]
+    print(f"\n{last['cycle'] + 1} cycles, {Monitor.frames} frames, {sink.lines} output lines, "
+          f"{last['simulated_hours']:.2f} simulated hours in {elapsed:.0f} s")
+    print(f"{'':>14} {'baseline':>10} {'last':>10} {'per 1000 cycles':>16}")
+    for key, label in (("rss_mb", "RSS MB"), ("fds", "open fds"), ("threads", "threads"),
+                       ("captures", "captures"), ("latency_ms", "latency ms"), ("latency_p95_ms", "p95 ms")):
+        print(f"{label:>14} {first[key]:>10.2f} {last[key]:>10.2f} {slope_per_1000(steady, key):>+16.3f}")
+    if args.report:
+        write_report(samples, args.report)
+        print(f"Samples written to {args.report}")
+
+    if failures:
+        print("\nFAILED:")
+        for failure in failures:
+            print(f"  {failure}")
+        sys.exit(1)
+    print("\nAll bounds held")
+
+if __name__ == "__main__":
+    main()
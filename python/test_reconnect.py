@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Test camera hot-reconnect with a fake capture source that is unplugged and replugged.
+
+Runs the real main() loop. Each scenario unplugs the fake camera in a
+different way (reads failing, reads hanging, device node removed, device
+reopening but stalling), plugs it back in after --downtime seconds and
+checks that exactly one lost and one recovered event were emitted with no
+per-frame errors. In the stall scenario reopened handles hang on their
+first read until the replug, so recovery must take more than one attempt:
+the reconnect probe has to time out instead of blocking the main loop. Time-to-recovery is
+measured from the replug to the recovered event. A final scenario leaves the
+camera unplugged past the give-up time and expects the camera to stop.
+"""
+
+import argparse
+import _thread
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+import blink_detector
+
+class FakeCamera:
+    """State of the one simulated device shared by every FakeCapture opened on it."""
+    plugged = True
+    mode = "fail"
+    replugged = threading.Event()
+
+    @classmethod
+    def unplug(cls, mode):
+        cls.mode = mode
+        cls.replugged.clear()
+        cls.plugged = False
+
+    @classmethod
+    def replug(cls):
+        cls.plugged = True
+        cls.replugged.set()
+
+class FakeCapture:
+    frame = np.full((240, 320, 3), 120, dtype=np.uint8)
+
+    def __init__(self, *args):
+        self.opened_plugged = FakeCamera.plugged
+        # A device on its way back can open before it delivers frames
+        self.stalled = not FakeCamera.plugged and FakeCamera.mode == "stall"
+
+    def isOpened(self):
+        return self.opened_plugged or self.stalled
+
+    def read(self):
+        if self.stalled:
+            FakeCamera.replugged.wait()
+            self.stalled = False
+            self.opened_plugged = True
+        if not self.opened_plugged:
+            return False, None
+        if not FakeCamera.plugged:
+            if FakeCamera.mode == "hang":
+                FakeCamera.replugged.wait()
+            # An unplugged handle stays dead even after the device returns
+            self.opened_plugged = False
+            return False, None
+        time.sleep(0.005)
+        return True, self.frame.copy()
+
+    def set(self, *args):
+        return True
+
+    def get(self, *args):
+        return 0
+
+    def release(self):
+        pass
+
+class EventSink:
+    """Collects the detector's output lines with the time they were written."""
+    def __init__(self):
+        self.lines = []
+
+    def write(self, text):
+        now = time.perf_counter()
+        for line in text.splitlines():
+            self.lines.append((now, json.loads(line)))
+
+    def flush(self):
+        pass
+
+    def find(self, predicate, since):
+        return [(t, message) for t, message in self.lines if t >= since and predicate(message)]
+
+def camera_event(name):
+    return lambda message: message.get("camera", {}).get("event") == name
+
+def wait_for(condition, timeout):
+    deadline = time.perf_counter() + timeout
+    while not condition():
+        if time.perf_counter() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+def run_scenarios(command_pipe, sink, args, results):
+    def send(command):
+        command_pipe.write(json.dumps(command) + "\n")
+        command_pipe.flush()
+
+    try:
+        send({"start_camera": True})
+        if not wait_for(lambda: blink_detector.CAMERA_ACTIVE and blink_detector.cap is not None, 60.0):
+            results.append(("start", False, "camera did not start"))
+            return
+
+        node_dir = tempfile.mkdtemp()
+        for mode in ("fail", "hang", "node", "stall"):
+            time.sleep(0.5)
+            if mode == "node":
+                node = os.path.join(node_dir, "video0")
+                open(node, "w").close()
+                blink_detector.camera_device_node = node
+            unplugged_at = time.perf_counter()
+            if mode == "node":
+                # Reads keep failing too, but the missing node is noticed first
+                os.remove(node)
+            FakeCamera.unplug(mode)
+
+            # Long enough for at least one probe of a stalled device to time out
+            time.sleep(args.downtime + (2 * blink_detector.CAMERA_READ_TIMEOUT if mode == "stall" else 0.0))
+            replugged_at = time.perf_counter()
+            FakeCamera.replug()
+            recovered = wait_for(lambda: sink.find(camera_event("recovered"), unplugged_at), 15.0)
+            blink_detector.output_writer.flush()
+
+            lost = sink.find(camera_event("lost"), unplugged_at)
+            recoveries = sink.find(camera_event("recovered"), unplugged_at)
+            errors = sink.find(lambda message: "error" in message, unplugged_at)
+            ok = recovered and len(lost) == 1 and len(recoveries) == 1 and not errors
+            if mode == "stall":
+                ok = ok and recoveries[0][1]["camera"]["attempts"] > 1
+            detail = {
+                "reason": lost[0][1]["camera"]["reason"] if lost else None,
+                "detect_ms": round((lost[0][0] - unplugged_at) * 1000) if lost else None,
+                "recovery_ms": round((recoveries[0][0] - replugged_at) * 1000) if recoveries else None,
+                "attempts": recoveries[0][1]["camera"]["attempts"] if recoveries else None,
+                "lost_events": len(lost),
+                "errors": len(errors),
+            }
+            results.append((mode, ok, detail))
+
+        # Never replugged: the detector gives up and stops the camera
+        blink_detector.CAMERA_RECONNECT_GIVE_UP = args.give_up
+        time.sleep(0.5)
+        unplugged_at = time.perf_counter()
+        FakeCamera.unplug("fail")
+        stopped = wait_for(lambda: not blink_detector.CAMERA_ACTIVE, args.give_up + 10.0)
+        blink_detector.output_writer.flush()
+        errors = sink.find(lambda message: "error" in message, unplugged_at)
+        results.append(("give_up", stopped and len(errors) == 1,
+                        {"stopped_after_ms": round((time.perf_counter() - unplugged_at) * 1000), "errors": len(errors)}))
+        FakeCamera.replug()
+    finally:
+        _thread.interrupt_main()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--downtime", type=float, default=1.0, help="Seconds the camera stays unplugged")
+    parser.add_argument("--give-up", type=float, default=2.0, help="Reconnect give-up time for the last scenario")
+    args = parser.parse_args()
+
+    # Shorter than the downtime so the hanging scenario trips the read timeout
+    blink_detector.CAMERA_READ_TIMEOUT = min(0.5, args.downtime / 2)
+    blink_detector.cv2.VideoCapture = FakeCapture
+    blink_detector.get_camera_backends = lambda: [0]
+    sink = EventSink()
+    blink_detector.output_writer.stream = sink
+
+    read_fd, write_fd = os.pipe()
+    sys.stdin = os.fdopen(read_fd)
+    # closefd=False: EOF on stdin would shut the detector down while the interpreter exits
+    command_pipe = os.fdopen(write_fd, "w", closefd=False)
+
+    results = []
+    driver = threading.Thread(target=run_scenarios, args=(command_pipe, sink, args, results), daemon=True)
+    driver.start()
+    blink_detector.main()
+    driver.join()
+
+    failed = False
+    for name, ok, detail in results:
+        failed |= not ok
+        print(f"{'PASS' if ok else 'FAIL'} {name}: {detail}")
+    sys.exit(1 if failed or not results else 0)
+
+if __name__ == "__main__":
+    main()
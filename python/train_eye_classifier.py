@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Train the eye-patch openness classifier from recorded sessions.
+
+Each video is run through the face detector and shape predictor. Every eye
+gives one patch, labelled by its EAR relative to that session's median: open
+above --open-ratio, closed below --closed-ratio, skipped in between. A
+logistic regression is fitted on the patch features with plain NumPy
+gradient descent and saved where blink_detector.py looks for it.
+
+Between predictor passes the detector cuts patches at held landmarks that
+lag the eye, so every eye is also sampled --jitter-copies times with the
+landmarks shifted by up to --jitter pixels. Copies of one eye stay on the
+same side of the train/validation split.
+"""
+
+import argparse
+import sys
+
+import cv2
+import numpy as np
+
+import blink_detector
+
+EYE_FEATURE_MIN_SCALE = 0.05
+
+def collect_session(video_path, detector, predictor, max_frames, jitter, jitter_copies, rng):
+    buffers = blink_detector.PreallocatedBuffers()
+    features = []
+    ears = []
+    eye_ids = []
+
+    capture = cv2.VideoCapture(video_path)
+    frame_index = 0
+    while frame_index < max_frames:
+        ret, frame = capture.read()
+        if not ret:
+            break
+        frame_index += 1
+        frame, gray = blink_detector.prepare_frame(frame)
+
+        faces = detector(gray, 0)
+        if len(faces) != 1:
+            continue
+        for eye_index, eye in enumerate(blink_detector.get_eye_landmarks_only(predictor, gray, faces[0], buffers)):
+            ear = blink_detector.calculate_ear_fast(eye, buffers)
+            shifts = [np.zeros(2)] + [rng.uniform(-jitter, jitter, 2) for _ in range(jitter_copies)]
+            for shift in shifts:
+                patch = blink_detector.extract_eye_patch(gray, eye + shift.astype(np.float32))
+                if patch is None:
+                    continue
+                features.append(blink_detector.eye_patch_features(patch))
+                ears.append(ear)
+                eye_ids.append(2 * frame_index + eye_index)
+    capture.release()
+
+    print(f"{video_path}: {frame_index} frames, {len(ears)} eye patches")
+    return np.array(features, dtype=np.float32), np.array(ears, dtype=np.float32), np.array(eye_ids)
+
+def fit_logistic(x, y, epochs, learning_rate, l2):
+    weights = np.zeros(x.shape[1], dtype=np.float32)
+    bias = 0.0
+    # Closed eyes are rare in normal sessions, so weight the classes evenly
+    sample_weight = np.where(y > 0.5, 0.5 / max(y.mean(), 1e-6), 0.5 / max(1.0 - y.mean(), 1e-6)).astype(np.float32)
+    for _ in range(epochs):
+        p = 1.0 / (1.0 + np.exp(-(x @ weights + bias)))
+        error = (p - y) * sample_weight
+        weights -= learning_rate * (x.T @ error / len(y) + l2 * weights)
+        bias -= learning_rate * float(error.mean())
+    return weights, bias
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("videos", nargs="+", help="Recorded session videos")
+    parser.add_argument("--output", default=blink_detector.get_model_path(blink_detector.EYE_CLASSIFIER_MODEL))
+    parser.add_argument("--max-frames", type=int, default=20000, help="Frames read per video")
+    parser.add_argument("--open-ratio", type=float, default=0.9, help="EAR / session median above which an eye is open")
+    parser.add_argument("--closed-ratio", type=float, default=0.6, help="EAR / session median below which an eye is closed")
+    parser.add_argument("--epochs", type=int, default=500)
+    parser.add_argument("--learning-rate", type=float, default=0.5)
+    parser.add_argument("--l2", type=float, default=1e-3)
+    parser.add_argument("--jitter", type=float, default=3.0, help="Landmark shift in pixels for the extra samples")
+    parser.add_argument("--jitter-copies", type=int, default=4, help="Shifted samples per eye")
+    args = parser.parse_args()
+
+    detector, predictor = blink_detector.load_models()
+    rng = np.random.default_rng(0)
+
+    all_features, all_labels, all_groups = [], [], []
+    for video_index, video_path in enumerate(args.videos):
+        features, ears, eye_ids = collect_session(video_path, detector, predictor, args.max_frames,
+                                                  args.jitter, args.jitter_copies, rng)
+        if len(ears) == 0:
+            continue
+        median = float(np.median(ears))
+        is_open = ears > median * args.open_ratio
+        is_closed = ears < median * args.closed_ratio
+        keep = is_open | is_closed
+        all_features.append(features[keep])
+        all_labels.append(is_open[keep].astype(np.float32))
+        all_groups.append(eye_ids[keep] * len(args.videos) + video_index)
+
+    if not all_features:
+        print("ERROR: No usable eye patches found")
+        sys.exit(1)
+    x = np.concatenate(all_features)
+    y = np.concatenate(all_labels)
+    closed_count = int((y < 0.5).sum())
+    print(f"Samples: {len(y)} ({len(y) - closed_count} open, {closed_count} closed)")
+    if closed_count < 20 or closed_count == len(y):
+        print("ERROR: Need at least 20 closed-eye and some open-eye samples; record sessions with more blinks")
+        sys.exit(1)
+
+    groups = np.concatenate(all_groups)
+    eyes = rng.permutation(np.unique(groups))
+    is_train = np.isin(groups, eyes[:int(len(eyes) * 0.8)])
+    train, test = np.flatnonzero(is_train), np.flatnonzero(~is_train)
+
+    mean = x[train].mean(axis=0)
+    # Features that barely vary in training must not blow up the logit when they do at runtime
+    scale = np.maximum(x[train].std(axis=0), EYE_FEATURE_MIN_SCALE)
+    weights, bias = fit_logistic((x[train] - mean) / scale, y[train], args.epochs, args.learning_rate, args.l2)
+    classifier = blink_detector.EyeOpennessClassifier(weights, bias, mean, scale)
+
+    for name, index in (("train", train), ("validation", test)):
+        predicted = classifier.score_features(x[index]) > 0.5
+        actual = y[index] > 0.5
+        closed_recall = (~predicted & ~actual).sum() / max((~actual).sum(), 1)
+        print(f"{name}: accuracy {np.mean(predicted == actual):.1%}, closed-eye recall {closed_recall:.1%}")
+
+    classifier.save(args.output)
+    print(f"Saved classifier to {args.output}")
+
+if __name__ == "__main__":
+    main()